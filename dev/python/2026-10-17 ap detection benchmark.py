@@ -0,0 +1,58 @@
+"""
+Measure how long it takes to detect APs in every sweep of an f-I protocol
+(ap_freq_per_sweep) as the number of APs per sweep grows. Sweeps are tiled
+copies of a real recording so every AP is a real AP.
+
+SAMPLE OUTPUT:
+     1x sweep length:    382 APs in 0.002 sec
+     4x sweep length:   1528 APs in 0.011 sec
+    16x sweep length:   6112 APs in 0.088 sec
+
+SAMPLE OUTPUT (before detection was vectorized across sweeps):
+     1x sweep length:    384 APs in 0.007 sec
+     4x sweep length:   1536 APs in 0.032 sec
+    16x sweep length:   6144 APs in 0.131 sec
+"""
+
+import os
+import sys
+PATH_HERE = os.path.abspath(os.path.dirname(__file__))
+PATH_DATA = os.path.abspath(PATH_HERE+"../../../data/abfs/")
+PATH_SRC = os.path.abspath(PATH_HERE+"../../../src/")
+sys.path.insert(0, PATH_SRC)
+import pyabf
+import pyabf.abfWriter
+import pyabf.tools.ap
+
+import time
+import logging
+import tempfile
+import warnings
+import numpy as np
+
+warnings.simplefilter("ignore")
+pyabf.abfWriter.log.setLevel(logging.WARNING)
+
+
+def timeDetection(repeats):
+    """Return [apCount, best seconds] to detect APs in sweeps tiled repeats times."""
+    abf = pyabf.ABF(PATH_DATA+"/171116sh_0019.abf")
+    sweepData = np.tile(abf.getSweepMatrix(0), repeats)
+    with tempfile.TemporaryDirectory() as tempFolder:
+        abfFilePath = os.path.join(tempFolder, "benchmark.abf")
+        pyabf.abfWriter.writeABF1(sweepData, abfFilePath, abf.dataRate, "mV")
+        abf = pyabf.ABF(abfFilePath)
+    times = []
+    for i in range(5):
+        t1 = time.perf_counter()
+        pyabf.tools.ap.ap_freq_per_sweep(abf)
+        times.append(time.perf_counter() - t1)
+    apCount = len(pyabf.tools.ap.ap_points(abf)[1])
+    return [apCount, min(times)]
+
+
+if __name__ == "__main__":
+    for repeats in [1, 4, 16]:
+        apCount, elapsed = timeDetection(repeats)
+        print("%2dx sweep length: %6d APs in %.03f sec" % (
+            repeats, apCount, elapsed))
@@ -0,0 +1,57 @@
+"""
+Measure how long it takes to iterate every sweep (setSweep, sweepC, and
+sweepD) of ABFs with different numbers of sweeps. Epoch tables are built once
+per channel, so time per sweep should be constant as sweep count grows.
+
+SAMPLE OUTPUT:
+      50 sweeps: 0.001 sec total (0.021 ms per sweep)
+     100 sweeps: 0.003 sec total (0.028 ms per sweep)
+     200 sweeps: 0.004 sec total (0.019 ms per sweep)
+     400 sweeps: 0.008 sec total (0.019 ms per sweep)
+     800 sweeps: 0.019 sec total (0.024 ms per sweep)
+
+SAMPLE OUTPUT (before epoch tables were cached):
+      50 sweeps: 0.062 sec total (1.247 ms per sweep)
+     100 sweeps: 0.298 sec total (2.979 ms per sweep)
+     200 sweeps: 1.115 sec total (5.574 ms per sweep)
+     400 sweeps: 3.510 sec total (8.775 ms per sweep)
+     800 sweeps: 16.591 sec total (20.739 ms per sweep)
+"""
+
+import os
+import sys
+PATH_HERE = os.path.abspath(os.path.dirname(__file__))
+PATH_DATA = os.path.abspath(PATH_HERE+"../../../data/abfs/")
+PATH_SRC = os.path.abspath(PATH_HERE+"../../../src/")
+sys.path.insert(0, PATH_SRC)
+import pyabf
+import pyabf.abfWriter
+
+import time
+import tempfile
+import logging
+import numpy as np
+
+pyabf.abfWriter.log.setLevel(logging.WARNING)
+
+
+def timeAllSweeps(sweepCount, sweepPointCount=1000):
+    """Return the time (sec) to iterate every sweep of a new ABF."""
+    sweepData = np.random.normal(size=(sweepCount, sweepPointCount))
+    with tempfile.TemporaryDirectory() as tempFolder:
+        abfFilePath = os.path.join(tempFolder, "benchmark.abf")
+        pyabf.abfWriter.writeABF1(sweepData, abfFilePath, 20000)
+        abf = pyabf.ABF(abfFilePath)
+        t1 = time.perf_counter()
+        for sweep in abf.sweepList:
+            abf.setSweep(sweep)
+            sweepC = abf.sweepC
+            sweepD = abf.sweepD(0)
+        return time.perf_counter() - t1
+
+
+if __name__ == "__main__":
+    for sweepCount in [50, 100, 200, 400, 800]:
+        elapsed = timeAllSweeps(sweepCount)
+        print("%4d sweeps: %.03f sec total (%.03f ms per sweep)" % (
+            sweepCount, elapsed, elapsed * 1000 / sweepCount))
@@ -0,0 +1,52 @@
+"""
+Measure how long it takes to generate a sweep waveform containing a single
+long epoch of each type. Pulse, Tri, and BiPhsc trains are generated without
+looping over pulses, so their time should not depend on pulse count.
+
+SAMPLE OUTPUT:
+    Step: 1.130 ms per sweep
+    Ramp: 3.737 ms per sweep
+    Pulse: 1.128 ms per sweep
+    Tri: 0.786 ms per sweep
+    Cos: 16.185 ms per sweep
+    BiPhsc: 1.123 ms per sweep
+
+SAMPLE OUTPUT (before pulse trains were vectorized):
+    Step: 4.277 ms per sweep
+    Ramp: 5.015 ms per sweep
+    Pulse: 30.773 ms per sweep
+    Tri: 396.264 ms per sweep
+    Cos: 20.178 ms per sweep
+    BiPhsc: 28.774 ms per sweep
+"""
+
+import os
+import sys
+PATH_HERE = os.path.abspath(os.path.dirname(__file__))
+PATH_SRC = os.path.abspath(PATH_HERE+"../../../src/")
+sys.path.insert(0, PATH_SRC)
+import pyabf
+import pyabf.waveform
+
+import time
+
+EPOCH_TYPES = ["Step", "Ramp", "Pulse", "Tri", "Cos", "BiPhsc"]
+
+
+def timeWaveform(epochType, pointCount=1000000, pulsePeriod=40,
+                 pulseWidth=10, repeats=10):
+    """Return the time (sec) to generate a waveform with one long epoch."""
+    sweepWaveform = pyabf.waveform.EpochSweepWaveform()
+    sweepWaveform.addEpoch(0, 1000, -70.0, "Step", 0, 0, [0]*8)
+    sweepWaveform.addEpoch(1000, pointCount, -20.0, epochType, pulseWidth,
+                           pulsePeriod, [0]*8)
+    t1 = time.perf_counter()
+    for i in range(repeats):
+        sweepWaveform.getWaveform()
+    return (time.perf_counter() - t1) / repeats
+
+
+if __name__ == "__main__":
+    for epochType in EPOCH_TYPES:
+        elapsed = timeWaveform(epochType)
+        print("%s: %.03f ms per sweep" % (epochType, elapsed * 1000))
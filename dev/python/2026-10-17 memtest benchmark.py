@@ -0,0 +1,50 @@
+"""
+Measure how long it takes to run a Memtest on every sweep of ABFs recorded
+with memtest steps and ramps. When the memtest epochs are at the same points
+in every sweep all sweeps are measured at once from the sweep matrix.
+
+SAMPLE OUTPUT:
+    18808025.abf (40 sweeps): 0.079 ms per sweep
+    2018_08_23_0009.abf (40 sweeps): 0.078 ms per sweep
+    2018_11_16_sh_0006.abf (60 sweeps): 0.052 ms per sweep
+    model_vc_step.abf (20 sweeps): 0.057 ms per sweep
+
+SAMPLE OUTPUT (before Memtest was calculated for all sweeps at once):
+    18808025.abf (40 sweeps): 0.572 ms per sweep
+    2018_08_23_0009.abf (40 sweeps): 0.530 ms per sweep
+    2018_11_16_sh_0006.abf (60 sweeps): 0.470 ms per sweep
+    model_vc_step.abf (20 sweeps): 0.504 ms per sweep
+"""
+
+import os
+import sys
+PATH_HERE = os.path.abspath(os.path.dirname(__file__))
+PATH_DATA = os.path.abspath(PATH_HERE+"../../../data/abfs/")
+PATH_SRC = os.path.abspath(PATH_HERE+"../../../src/")
+sys.path.insert(0, PATH_SRC)
+import pyabf
+import pyabf.tools.memtest
+
+import time
+import warnings
+
+warnings.simplefilter("ignore")
+
+
+def timeMemtest(abfFileName, repeats=10):
+    """Return the best time (sec) to run a Memtest on an ABF."""
+    abf = pyabf.ABF(os.path.join(PATH_DATA, abfFileName))
+    times = []
+    for i in range(repeats):
+        t1 = time.perf_counter()
+        pyabf.tools.memtest.Memtest(abf)
+        times.append(time.perf_counter() - t1)
+    return [abf, min(times)]
+
+
+if __name__ == "__main__":
+    for abfFileName in ["18808025.abf", "2018_08_23_0009.abf",
+                        "2018_11_16_sh_0006.abf", "model_vc_step.abf"]:
+        abf, elapsed = timeMemtest(abfFileName)
+        print("%s (%d sweeps): %.03f ms per sweep" % (
+            abfFileName, abf.sweepCount, elapsed * 1000 / abf.sweepCount))
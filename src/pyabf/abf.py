@@ -10,6 +10,7 @@ are to be written in another file and imported as necessary.
 import pyabf.abfWriter
 import pyabf.stimulus
 import pyabf.abfHeaderDisplay
+import pyabf.fileHash
 
 from pyabf.abfHeader import BLOCKSIZE
 from pyabf.abfHeader import StringsIndexed
@@ -32,12 +33,15 @@ import time
 import datetime
 import numpy as np
 from pathlib import PureWindowsPath
-import hashlib
+import collections
 
 import logging
 logging.basicConfig(level=logging.WARN)
 log = logging.getLogger(__name__)
 
+DATA_MODES = ["memory", "raw", "mmap"]
+SWEEP_CACHE_SIZE = 16
+
 
 class ABF:
     """
@@ -46,19 +50,50 @@ class ABF:
 
     The default action is to read all the ABF data from disk when the class is
     instantiated. When disabled (with an argument) to save speed, one can
-    quickly iterate through many ABF files to access header contents.
+    quickly iterate through many ABF files to access header contents. If data
+    was not loaded, setSweep() reads just the bytes of the requested sweep.
 
     Although you can access all data with abf.data, you can also call
     abf.setSweep() then access abf.sweepX and abf.sweepY and similar values.
+
+    The dataMode argument determines how signal data is stored. The default
+    ("memory") reads all data into abf.data as scaled floating-point values.
+    In "raw" mode the original (usually int16) values are kept in memory and
+    only scaled when a sweep (or abf.data) is requested. In "mmap" mode the
+    data section is memory-mapped and also scaled on request, so only the
+    pages actually read are loaded from disk. This allows very large files to
+    be opened quickly. Scaled data is float32 unless another dataFloatType
+    (e.g., np.float64) is given. In these modes the first access of abf.data
+    scales the whole file into memory (which is then used for all data
+    access). In raw mode this keeps both the raw and the scaled values in
+    memory (three times the memory of int16 data as float32), so use
+    setSweep(), getSweepMatrix(), or getDataRange() to work with part of a
+    large file.
+
+    If hashFile is True the MD5 of the file (abf.md5 and abf.fileUUID) is
+    calculated in a background thread while the header and data are read.
     """
 
     def __init__(self, abfFilePath, loadData=True,
-                 cacheStimulusFiles=True, stimulusFileFolder=None):
+                 cacheStimulusFiles=True, stimulusFileFolder=None,
+                 dataMode="memory", dataFloatType=np.float32,
+                 hashFile=False):
 
         if abfFilePath.lower().endswith(".atf"):
             raise Exception("use pyabf.ATF (not pyabf.ABF) for ATF files")
 
+        if not dataMode in DATA_MODES:
+            raise ValueError("dataMode must be one of: %s" %
+                             (", ".join(DATA_MODES)))
+
         self._preLoadData = loadData
+        self._dataMode = dataMode
+        self._dataFloatType = dataFloatType
+        self._dataRaw = None
+        self._sweepCache = collections.OrderedDict()
+        self._epochTables = {}
+        self._commandMatrices = {}
+        self._digitalMatrices = {}
         self._cacheStimulusFiles = cacheStimulusFiles
 
         self.abfFilePath = os.path.abspath(abfFilePath)
@@ -74,6 +109,9 @@ class ABF:
         self.abfID = os.path.splitext(os.path.basename(self.abfFilePath))[0]
         log.debug(self.__repr__())
 
+        if hashFile:
+            self._md5Future = pyabf.fileHash.md5Background(self.abfFilePath)
+
         with open(self.abfFilePath, 'rb') as fb:
 
             # get a preliminary ABF version from the ABF file itself
@@ -95,11 +133,35 @@ class ABF:
             fb.seek(0, os.SEEK_END)
             self._fileSize = fb.tell()
 
-            # optionally load data from disk
+            # optionally load (or memory-map) data from disk
             if self._preLoadData:
-                self._loadAndScaleData(fb)
+                if self._dataMode == "memory":
+                    self._loadAndScaleData(fb)
+                else:
+                    self._loadRawData()
                 self.setSweep(0)
 
+    def __getattr__(self, name):
+        """
+        abf.data is only stored as an attribute when it has been loaded into
+        memory. Otherwise it is created here the first time it is requested.
+        In raw and mmap modes all data is scaled once and kept, so subsequent
+        reads are fast and modifications (e.g., filtering) are not lost.
+        """
+        if name != "data" or not "_dataMode" in self.__dict__:
+            raise AttributeError("'ABF' object has no attribute '%s'" % name)
+        if self._dataMode in ["raw", "mmap"]:
+            log.debug("scaling all raw ABF data...")
+            if self._dataRaw is None:
+                self._loadRawData()
+            self.data = self._scaleRaw(self._dataRaw)
+            self._sweepCache.clear()
+            return self.data
+        log.debug("ABF data not preloaded. Loading now...")
+        with open(self.abfFilePath, 'rb') as fb:
+            self._loadAndScaleData(fb)
+        return self.data
+
     def __str__(self):
         """Return a string describing basic properties of the loaded ABF."""
 
@@ -148,8 +210,8 @@ class ABF:
         return txt
 
     def __repr__(self):
-        return 'ABFcore(abf="%s", loadData=%s)' % \
-            (self.abfFilePath, self._preLoadData)
+        return 'ABFcore(abf="%s", loadData=%s, dataMode="%s")' % \
+            (self.abfFilePath, self._preLoadData, self._dataMode)
 
     def _readHeadersV1(self, fb):
         """Populate class variables from the ABF1 header."""
@@ -391,20 +453,111 @@ class ABF:
         fb.seek(self.dataByteStart)
         raw = np.fromfile(fb, dtype=self._dtype,
                           count=self.dataPointCount)
+
+        # de-interleave channels with a transposed view (no copy is made)
         nRows = self.channelCount
         nCols = int(self.dataPointCount/self.channelCount)
-        raw = np.reshape(raw, (nCols, nRows))
-        raw = np.rot90(raw)
-        raw = raw[::-1]
+        raw = np.reshape(raw, (nCols, nRows)).T
 
-        # if data is int, scale it to float32 so we can scale it
-        self.data = raw.astype(np.float32)
+        # scale all channels at once into a single new float array
+        self.data = self._scaleRaw(raw)
 
-        # if the data was originally an int, it must be scaled
-        if self._dtype == np.int16:
-            for i in range(self.channelCount):
-                self.data[i] = np.multiply(self.data[i], self._dataGain[i])
-                self.data[i] = np.add(self.data[i], self._dataOffset[i])
+    def _loadRawData(self):
+        """
+        Load unscaled data from the ABF file (or memory-map the data section
+        if dataMode is "mmap"). Values are not scaled until requested.
+        """
+        if self._dataMode == "mmap":
+            raw = np.memmap(self.abfFilePath, dtype=self._dtype, mode='r',
+                            offset=self.dataByteStart,
+                            shape=(self.dataPointCount,))
+        else:
+            with open(self.abfFilePath, 'rb') as fb:
+                fb.seek(self.dataByteStart)
+                raw = np.fromfile(fb, dtype=self._dtype,
+                                  count=self.dataPointCount)
+        nRows = self.channelCount
+        nCols = int(self.dataPointCount/self.channelCount)
+        self._dataRaw = np.reshape(raw, (nCols, nRows)).T
+
+    def _scaleRaw(self, raw, channel=None):
+        """
+        Return a scaled floating-point copy of raw (unscaled) ABF data. If a
+        channel is not given, raw is expected to have one row per channel.
+        Scaling happens in place, so the output is the only array allocated.
+        """
+        scaled = np.empty(raw.shape, dtype=self._dataFloatType)
+        if self._dtype != np.int16:
+            scaled[:] = raw
+            return scaled
+        floatType = self._dataFloatType
+        if channel is None:
+            gain = np.array(self._dataGain, floatType)[:, None]
+            offset = np.array(self._dataOffset, floatType)[:, None]
+        else:
+            gain = np.array(self._dataGain[channel], floatType)
+            offset = np.array(self._dataOffset[channel], floatType)
+        np.multiply(raw, gain, out=scaled)
+        scaled += offset
+        return scaled
+
+    def _readRaw(self, pointStart, pointEnd):
+        """
+        Read unscaled data for every channel between two points (per-channel
+        point numbers) from disk without reading the rest of the data section.
+        The returned array has one row per channel.
+        """
+        pointStart = max(0, pointStart)
+        pointEnd = min(pointEnd, int(self.dataPointCount/self.channelCount))
+        pointCount = max(0, pointEnd - pointStart)
+        byteStart = self.dataByteStart
+        byteStart += pointStart * self.channelCount * self.dataPointByteSize
+        with open(self.abfFilePath, 'rb') as fb:
+            fb.seek(byteStart)
+            raw = np.fromfile(fb, dtype=self._dtype,
+                              count=pointCount*self.channelCount)
+        raw = np.reshape(raw, (-1, self.channelCount))
+        return raw.T
+
+    def _getChannelData(self, channel, pointStart, pointEnd):
+        """
+        Return scaled data for a channel between two points. If data is not
+        in memory only the requested range is read (from disk, raw data, or
+        the memory-mapped data section) and scaled.
+        """
+        if "data" in self.__dict__:
+            return self.data[channel, pointStart:pointEnd]
+        if self._dataMode in ["raw", "mmap"]:
+            if self._dataRaw is None:
+                self._loadRawData()
+            raw = self._dataRaw[channel, pointStart:pointEnd]
+        else:
+            log.debug("reading points %d-%d from disk" %
+                      (pointStart, pointEnd))
+            raw = self._readRaw(pointStart, pointEnd)[channel]
+        return self._scaleRaw(raw, channel)
+
+    def _getSweepData(self, sweepNumber, channel):
+        """
+        Return scaled data for the given sweep and channel. If data is not
+        in memory recently decoded sweeps are cached so flipping between
+        sweeps doesn't re-read them.
+        """
+        pointStart = self.sweepPointCount*sweepNumber
+        pointEnd = pointStart + self.sweepPointCount
+        if "data" in self.__dict__:
+            return self.data[channel, pointStart:pointEnd]
+
+        cacheKey = (sweepNumber, channel)
+        if cacheKey in self._sweepCache:
+            self._sweepCache.move_to_end(cacheKey)
+            return self._sweepCache[cacheKey]
+
+        sweepY = self._getChannelData(channel, pointStart, pointEnd)
+        self._sweepCache[cacheKey] = sweepY
+        while len(self._sweepCache) > SWEEP_CACHE_SIZE:
+            self._sweepCache.popitem(last=False)
+        return sweepY
 
     def _ide_helper(self):
         """
@@ -460,19 +613,43 @@ class ABF:
             os.remove(tmpFilePath)
             log.info("deleted %s" % (tmpFilePath))
 
-    def saveABF1(self, filename, sampleRateHz):
+    def saveABF1(self, filename, sampleRateHz=None):
         """
         Save this ABF file as an ABF1 file compatible with ClampFit and
-        MiniAnalysis. To create an ABF1 file from scratch (not starting from
-        an existing ABF file), see methods in the pyabf.abfWriter module.
+        MiniAnalysis. All channels are saved. If the data is stored as
+        integers and abf.data was never loaded (dataMode "raw" or "mmap", or
+        loadData=False) the original values are copied exactly (along with the
+        header values used to scale them). Otherwise abf.data (including any
+        changes made to it) is re-scaled to integers.
+        To create an ABF1 file from scratch (not starting from an existing ABF
+        file), see methods in the pyabf.abfWriter module.
         """
         filename = os.path.abspath(filename)
         log.info("Saving ABF as ABF1 file: %s" % filename)
-        sweepData = np.empty((self.sweepCount, self.sweepPointCount))
-        for sweep in self.sweepList:
-            self.setSweep(sweep)
-            sweepData[sweep] = self.sweepY
-        pyabf.abfWriter.writeABF1(sweepData, filename, sampleRateHz)
+        if sampleRateHz is None:
+            sampleRateHz = self.dataRate
+        if self._dtype == np.int16 and not "data" in self.__dict__:
+            pyabf.abfWriter.writeABF1Raw(self, filename, sampleRateHz)
+        else:
+            sweepData = np.array([self.getSweepMatrix(x)
+                                  for x in self.channelList])
+            pyabf.abfWriter.writeABF1(sweepData, filename, sampleRateHz,
+                                      self.adcUnits)
+        log.info("saved ABF1 file: %s" % filename)
+
+    def saveSubset(self, filename, sweeps=None, channels=None,
+                   timeSec1=None, timeSec2=None):
+        """
+        Save part of this ABF (a list of sweeps, a list of channels, and/or
+        the range of each sweep between two times) as a new ABF1 file. Values
+        are copied from the original file without being decoded, so this
+        requires an ABF with int16 data.
+        """
+        filename = os.path.abspath(filename)
+        log.info("Saving ABF subset as ABF1 file: %s" % filename)
+        pyabf.abfWriter.writeABF1Raw(self, filename, sweeps=sweeps,
+                                     channels=channels, timeSec1=timeSec1,
+                                     timeSec2=timeSec2)
         log.info("saved ABF1 file: %s" % filename)
 
     def launchInClampFit(self):
@@ -507,17 +684,8 @@ class ABF:
                 channel, self.channelCount-1)
             raise ValueError(msg)
 
-        if not "data" in (dir(self)):
-            log.debug("ABF data not preloaded. Loading now...")
-            with open(self.abfFilePath, 'rb') as fb:
-                self._loadAndScaleData(fb)
-
         # TODO: prevent re-loading of the same sweep.
 
-        # determine data bounds for that sweep
-        pointStart = self.sweepPointCount*sweepNumber
-        pointEnd = pointStart + self.sweepPointCount
-
         # start updating class-level variables
 
         # sweep information
@@ -544,7 +712,7 @@ class ABF:
             self.sweepLabelC = "Applied Current (pA)"
 
         # load the actual sweep data
-        self.sweepY = self.data[channel, pointStart:pointEnd]
+        self.sweepY = self._getSweepData(sweepNumber, channel)
         self.sweepX = np.arange(len(self.sweepY))*self.dataSecPerPoint
         if absoluteTime:
             self.sweepX += sweepNumber * self.sweepIntervalSec
@@ -566,9 +734,153 @@ class ABF:
         assert (self.sweepPointCount == len(self.sweepY))
 
         # prepare the stimulus waveform table for this sweep/channel
-        epochTable = pyabf.waveform.EpochTable(self, channel)
+        epochTable = self._getEpochTable(channel)
         self.sweepEpochs = epochTable.epochWaveformsBySweep[sweepNumber]
 
+    def _getEpochTable(self, channel):
+        """
+        Return the epoch table for the given channel. Each table is built
+        (for all sweeps) the first time it is needed, then reused.
+        """
+        if not channel in self._epochTables:
+            epochTable = pyabf.waveform.EpochTable(self, channel)
+            self._epochTables[channel] = epochTable
+        return self._epochTables[channel]
+
+    def getSweepMatrix(self, channel=0, timeSec1=None, timeSec2=None):
+        """
+        Return data for every sweep of a channel as a 2D array (one row per
+        sweep). Optionally provide two times (seconds from the start of each
+        sweep) to return only that range of each sweep.
+
+        If data is stored in memory (the default) the array returned is a view
+        of abf.data rather than a copy, so modifying it modifies abf.data.
+        """
+
+        if not channel in self.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, self.channelCount-1)
+            raise ValueError(msg)
+
+        # determine the range of points to use in each sweep
+        pointStart, pointEnd = 0, self.sweepPointCount
+        if timeSec1 is not None:
+            pointStart = max(0, int(timeSec1*self.dataRate))
+        if timeSec2 is not None:
+            pointEnd = min(pointEnd, int(timeSec2*self.dataRate))
+
+        # reshape (without copying) the channel data into sweeps
+        shape = (self.sweepCount, self.sweepPointCount)
+        pointCount = self.sweepCount*self.sweepPointCount
+        if self._dataMode == "memory" or "data" in self.__dict__:
+            sweeps = np.reshape(self.data[channel, :pointCount], shape)
+            return sweeps[:, pointStart:pointEnd]
+
+        # scale just the requested range of raw data
+        if self._dataRaw is None:
+            self._loadRawData()
+        sweeps = np.reshape(self._dataRaw[channel, :pointCount], shape)
+        return self._scaleRaw(sweeps[:, pointStart:pointEnd], channel)
+
+    def getCommandMatrix(self, channel=0):
+        """
+        Return the command waveform (sweepC) of every sweep of a channel as a
+        2D array (one row per sweep). The array is generated once (from the
+        epoch table, stimulus file, or holding level) and cached, so it is
+        read-only. A compact form of epoch waveforms (epoch boundaries and
+        levels of each sweep) is available in the channel's epoch table.
+        """
+
+        if not channel in self.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, self.channelCount-1)
+            raise ValueError(msg)
+
+        if isinstance(getattr(self, "_sweepC", None), np.ndarray):
+            # someone set a custom waveform, so always use it
+            sweepCs = np.tile(self._sweepC, (self.sweepCount, 1))
+            sweepCs.flags.writeable = False
+            return sweepCs
+
+        if not channel in self._commandMatrices:
+            stimulus = self.stimulusByChannel[channel]
+            sweepCs = stimulus.stimulusWaveformMatrix()
+            sweepCs.flags.writeable = False
+            self._commandMatrices[channel] = sweepCs
+        return self._commandMatrices[channel]
+
+    def getDigitalMatrix(self, channel=0):
+        """
+        Return the state of all 8 digital outputs for every sweep (using the
+        epoch table of the given channel) as a packed uint8 array with one row
+        per sweep and one byte per point. Bit N of each byte is the state of
+        digital output N. Decode it with pyabf.waveform.unpackDigitalOutputs().
+        The array is cached, so it is read-only.
+        """
+
+        if not channel in self.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, self.channelCount-1)
+            raise ValueError(msg)
+
+        if not channel in self._digitalMatrices:
+            sweepDs = self._getEpochTable(channel).getDigitalMatrix()
+            sweepDs.flags.writeable = False
+            self._digitalMatrices[channel] = sweepDs
+        return self._digitalMatrices[channel]
+
+    def getDataRange(self, timeSec1, timeSec2, channel=0):
+        """
+        Return [dataX, dataY] for the given channel between two times (seconds
+        from the start of the recording). This is most useful for gap-free
+        files where the only sweep is the whole recording. If data is not in
+        memory only the bytes in this time range are read from disk.
+
+        For episodic files time is measured along the recorded data (sweeps
+        placed end to end), so time between sweeps is not included.
+        """
+
+        if not channel in self.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, self.channelCount-1)
+            raise ValueError(msg)
+
+        pointCount = int(self.dataPointCount/self.channelCount)
+        pointStart = max(0, int(timeSec1*self.dataRate))
+        pointEnd = min(pointCount, int(timeSec2*self.dataRate))
+        pointEnd = max(pointStart, pointEnd)
+
+        dataY = self._getChannelData(channel, pointStart, pointEnd)
+        dataX = np.arange(pointStart, pointEnd)*self.dataSecPerPoint
+        return [dataX, dataY]
+
+    def iterChunks(self, channel=0, chunkSec=10, overlapSec=0):
+        """
+        Iterate through the recorded data of a channel in blocks of chunkSec
+        seconds, yielding [timeSec, dataY] for each block (where timeSec is
+        the time of its first point). Each block starts overlapSec before the
+        end of the previous one. If data is not in memory each block is read
+        from disk as it is needed, so memory use does not grow with file size.
+        """
+
+        if not channel in self.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, self.channelCount-1)
+            raise ValueError(msg)
+
+        chunkPoints = int(chunkSec*self.dataRate)
+        stepPoints = chunkPoints - int(overlapSec*self.dataRate)
+        if chunkPoints < 1 or stepPoints < 1:
+            raise ValueError("chunkSec must be greater than overlapSec")
+
+        pointCount = int(self.dataPointCount/self.channelCount)
+        for pointStart in range(0, pointCount, stepPoints):
+            pointEnd = min(pointStart + chunkPoints, pointCount)
+            dataY = self._getChannelData(channel, pointStart, pointEnd)
+            yield [pointStart*self.dataSecPerPoint, dataY]
+            if pointEnd == pointCount:
+                break
+
     @property
     def sweepC(self):
         """Generate the sweep command waveform."""
@@ -606,7 +918,7 @@ class ABF:
     def sweepD(self, digOutNumber=0):
         """Generate a waveform for the given digital output."""
         assert isinstance(self, pyabf.ABF)
-        epochTable = pyabf.waveform.EpochTable(self, self.sweepChannel)
+        epochTable = self._getEpochTable(self.sweepChannel)
         sweepWaveform = epochTable.epochWaveformsBySweep[self.sweepNumber]
         sweepD = sweepWaveform.getDigitalWaveform(digOutNumber)
         return sweepD
@@ -638,9 +950,10 @@ class ABF:
     def md5(self):
         """MD5 hash string of the whole ABF file."""
         if not hasattr(self, "_md5"):
-            with open(self.abfFilePath, 'rb') as f:
-                hasher = hashlib.md5(f.read())
-                self._md5 = hasher.hexdigest().upper()
+            if hasattr(self, "_md5Future"):
+                self._md5 = self._md5Future.result()
+            else:
+                self._md5 = pyabf.fileHash.md5(self.abfFilePath)
         return self._md5
 
     @property
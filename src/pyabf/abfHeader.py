@@ -111,6 +111,271 @@ def readStruct(fb, structFormat, seek=False, cleanStrings=True):
     return vals
 
 
+class StructLayout:
+    """
+    A StructLayout describes values stored at known byte positions in an ABF
+    header. Fields are given as [name, structFormat, byteOffset] and are
+    compiled into a single struct.Struct (gaps become pad bytes), so all
+    values can be decoded at once from a buffer read with a single call
+    rather than seeking and reading each value from the file individually.
+    Values are cleaned the same way readStruct() cleans them.
+    """
+
+    def __init__(self, fields):
+        self.names = []
+        self.fields = []
+        structFormat = "<"
+        position = 0
+        itemCount = 0
+        fields = sorted(fields, key=lambda field: field[2])
+        for name, fieldFormat, byteOffset in fields:
+            if byteOffset < position:
+                raise ValueError("field overlaps previous field: " + name)
+            if byteOffset > position:
+                structFormat += "%dx" % (byteOffset - position)
+            fieldStruct = struct.Struct("<" + fieldFormat)
+            fieldValues = fieldStruct.unpack(bytes(fieldStruct.size))
+            isString = type(fieldValues[0]) == type(b'')
+            firstItem, itemCount = itemCount, itemCount + len(fieldValues)
+            self.names.append(name)
+            self.fields.append([name, firstItem, itemCount, isString])
+            structFormat += fieldFormat
+            position = byteOffset + fieldStruct.size
+        self.struct = struct.Struct(structFormat)
+        self.size = self.struct.size
+        self._entryStructs = {}
+
+    def _fieldValue(self, vals, firstItem, lastItem, isString):
+        """Return a single value (or list of values) from unpacked items."""
+        fieldVals = vals[firstItem:lastItem]
+        if isString:
+            fieldVals = [x.decode("ascii", errors='ignore').strip()
+                         for x in fieldVals]
+        if len(fieldVals) == 1:
+            return fieldVals[0]
+        return list(fieldVals)
+
+    def unpack(self, buffer, offset=0):
+        """Return a dictionary of values decoded from the buffer."""
+        vals = self.struct.unpack_from(buffer, offset)
+        values = {}
+        for name, firstItem, lastItem, isString in self.fields:
+            values[name] = self._fieldValue(vals, firstItem, lastItem,
+                                            isString)
+        return values
+
+    def unpackEntries(self, buffer, entrySize, entryCount):
+        """
+        Decode a section made of several equally sized entries. Return a
+        dictionary with a list of values (one per entry) for every field.
+        """
+        if entrySize < self.size:
+            # empty sections may report an entry size of zero
+            entries = [self.struct.unpack_from(buffer, i*entrySize)
+                       for i in range(entryCount)]
+        else:
+            if not entrySize in self._entryStructs:
+                entryFormat = self.struct.format
+                entryFormat += "%dx" % (entrySize - self.size)
+                self._entryStructs[entrySize] = struct.Struct(entryFormat)
+            entryStruct = self._entryStructs[entrySize]
+            entries = list(entryStruct.iter_unpack(
+                buffer[:entrySize*entryCount]))
+        columns = list(zip(*entries))
+
+        values = {}
+        for name, firstItem, lastItem, isString in self.fields:
+            if lastItem - firstItem == 1 and not isString:
+                values[name] = list(columns[firstItem]) if entries else []
+            else:
+                values[name] = [self._fieldValue(x, firstItem, lastItem,
+                                                 isString) for x in entries]
+        return values
+
+
+def readEntries(fb, layout, byteStart, entrySize, entryCount):
+    """
+    Read all entries of a section in a single read and return a dictionary
+    with a list of values (one per entry) for every field of the layout.
+    """
+    fb.seek(byteStart)
+    buffer = fb.read(entrySize*entryCount)
+    return layout.unpackEntries(buffer, entrySize, entryCount)
+
+
+HEADERV1_LAYOUT = StructLayout([
+    # GROUP 1 - File ID and size information. (40 bytes)
+    ["lFileSignature", "i", 0],
+    ["fFileVersionNumber", "f", 4],
+    ["nOperationMode", "h", 8],
+    ["lActualAcqLength", "i", 10],
+    ["nNumPointsIgnored", "h", 14],
+    ["lActualEpisodes", "i", 16],
+    ["lFileStartDate", "i", 20],
+    ["lFileStartTime", "i", 24],
+    ["lStopwatchTime", "i", 28],
+    ["fHeaderVersionNumber", "f", 32],
+    ["nFileType", "h", 36],
+    ["nMSBinFormat", "h", 38],
+
+    # GROUP 2 - File Structure (78 bytes)
+    ["lDataSectionPtr", "i", 40],
+    ["lTagSectionPtr", "i", 44],
+    ["lNumTagEntries", "i", 48],
+
+    # missing entries
+
+    ["lSynchArrayPtr", "i", 92],
+    ["lSynchArraySize", "i", 96],
+    ["nDataFormat", "h", 100],
+
+    # missing entries
+
+    # GROUP 3 - Trial hierarchy information (82 bytes)
+    ["nADCNumChannels", "h", 120],
+    ["fADCSampleInterval", "f", 122],
+    # missing entries
+    ["fSynchTimeUnit", "f", 130],
+    # missing entries
+    ["lNumSamplesPerEpisode", "i", 138],
+    ["lPreTriggerSamples", "i", 142],
+    ["lEpisodesPerRun", "i", 146],
+    # missing entries
+
+    # GROUP 4 - Display Parameters (44 bytes)
+    # missing entries
+
+    # GROUP 5 - Hardware information (16 bytes)
+    ["fADCRange", "f", 244],
+    ["fDACRange", "f", 248],
+    ["lADCResolution", "i", 252],
+    ["lDACResolution", "i", 256],
+
+    # GROUP 6 - Environmental Information (118 bytes)
+    ["nExperimentType", "h", 260],
+    # missing entries
+    ["sCreatorInfo", "16s", 294],
+    ["sFileCommentOld", "56s", 310],
+    ["nFileStartMillisecs", "h", 366],
+    # missing entries
+
+    # GROUP 7 - Multi-channel information (1044 bytes)
+    ["nADCPtoLChannelMap", "16h", 378],
+    ["nADCSamplingSeq", "16h", 410],
+    ["sADCChannelName", "10s"*16, 442],
+    ["sADCUnits", "8s"*16, 602],
+    ["fADCProgrammableGain", "16f", 730],
+    # missing entries
+    ["fInstrumentScaleFactor", "16f", 922],
+    ["fInstrumentOffset", "16f", 986],
+    ["fSignalGain", "16f", 1050],
+    ["fSignalOffset", "16f", 1114],
+    ["sDACChannelName", "10s"*4, 1306],
+    ["sDACChannelUnit", "8s"*4, 1346],
+    # missing entries
+
+    # GROUP 8 - Synchronous timer outputs (14 bytes)
+    # missing entries
+    # GROUP 9 - Epoch Waveform and Pulses (184 bytes)
+    ["nDigitalEnable", "h", 1436],
+    # missing entries
+    ["nActiveDACChannel", "h", 1440],
+    # missing entries
+    ["nDigitalHolding", "h", 1584],
+    ["nDigitalInterEpisode", "h", 1586],
+    # missing entries
+    ["nDigitalValue", "10h", 1588],
+
+    # GROUP 10 - DAC Output File (98 bytes)
+    # missing entries
+    # GROUP 11 - Presweep (conditioning) pulse train (44 bytes)
+    # missing entries
+    # GROUP 13 - Autopeak measurement (36 bytes)
+    # missing entries
+    # GROUP 14 - Channel Arithmetic (52 bytes)
+    # missing entries
+    # GROUP 15 - On-line subtraction (34 bytes)
+    # missing entries
+    # GROUP 16 - Miscellaneous variables (82 bytes)
+    # missing entries
+    # EXTENDED GROUP 2 - File Structure (16 bytes)
+    ["lDACFilePtr", "2i", 2048],
+    ["lDACFileNumEpisodes", "2i", 2056],
+    # EXTENDED GROUP 3 - Trial Hierarchy
+    # missing entries
+    # EXTENDED GROUP 7 - Multi-channel information (62 bytes)
+    ["fDACCalibrationFactor", "4f", 2074],
+    ["fDACCalibrationOffset", "4f", 2090],
+
+    # GROUP 17 - Trains parameters (160 bytes)
+    # missing entries
+    # EXTENDED GROUP 9 - Epoch Waveform and Pulses (412 bytes)
+    ["nWaveformEnable", "2h", 2296],
+    ["nWaveformSource", "2h", 2300],
+    ["nInterEpisodeLevel", "2h", 2304],
+    ["nEpochType", "20h", 2308],
+    ["fEpochInitLevel", "20f", 2348],
+    ["fEpochLevelInc", "20f", 2428],
+    ["lEpochInitDuration", "20i", 2508],
+    ["lEpochDurationInc", "20i", 2588],
+    # missing entries
+
+    # EXTENDED GROUP 10 - DAC Output File (552 bytes)
+    ["fDACFileScale", "2f", 2708],
+    ["fDACFileOffset", "2f", 2716],
+    ["lDACFileEpisodeNum", "2i", 2724],
+    ["nDACFileADCNum", "2h", 2732],
+    ["sDACFilePath", "256s"*2, 2736],
+    # EXTENDED GROUP 11 - Presweep (conditioning) pulse train (100 bytes)
+    # missing entries
+    # EXTENDED GROUP 12 - Variable parameter user list (1096 bytes)
+    # missing entries
+    # EXTENDED GROUP 15 - On-line subtraction (56 bytes)
+    # missing entries
+    # EXTENDED GROUP 6 Environmental Information  (898 bytes)
+    ["nTelegraphEnable", "16h", 4512],
+    ["nTelegraphInstrument", "16h", 4544],
+    ["fTelegraphAdditGain", "16f", 4576],
+    ["fTelegraphFilter", "16f", 4640],
+    ["fTelegraphMembraneCap", "16f", 4704],
+    ["nTelegraphMode", "16h", 4768],
+    ["nTelegraphDACScaleFactorEnable", "4h", 4800],
+    # missing entries
+    ["sProtocolPath", "256s", 4898],
+    ["sFileCommentNew", "128s", 5154],
+    ["fInstrumentHoldingLevel", "4f", 5298],
+    ["ulFileCRC", "I", 5314],
+    # missing entries
+    ["nCreatorMajorVersion", "h", 5798],
+    ["nCreatorMinorVersion", "h", 5800],
+    ["nCreatorBugfixVersion", "h", 5802],
+    ["nCreatorBuildVersion", "h", 5804],
+
+    # EXTENDED GROUP 13 - Statistics measurements (388 bytes)
+    # missing entries
+    # GROUP 18 - Application version data (16 bytes)
+    ["uFileGUID", "16B", 5282],
+    # missing entries
+    # GROUP 19 - LTP protocol (14 bytes)
+    # missing entries
+    # GROUP 20 - Digidata 132x Trigger out flag. (8 bytes)
+    # missing entries
+    # GROUP 21 - Epoch resistance (56 bytes) // TODO old value of 40 correct??
+    # missing entries
+    # GROUP 22 - Alternating episodic mode (58 bytes)
+    # missing entries
+    # GROUP 23 - Post-processing actions (210 bytes)
+    # missing entries
+])
+
+TAGV1_LAYOUT = StructLayout([
+    ["lTagTime", "i", 0],
+    ["sTagComment", "56s", 4],
+    ["nTagType", "h", 60],
+])
+TAGV1_ENTRY_SIZE = 64
+
+
 class HeaderV1:
     """
     The first several bytes of an ABF1 file contain variables
@@ -121,168 +386,9 @@ class HeaderV1:
     """
 
     def __init__(self, fb):
-        # GROUP 1 - File ID and size information. (40 bytes)
-        self.lFileSignature = readStruct(fb, "i", 0)
-        self.fFileVersionNumber = readStruct(fb, "f", 4)
-        self.nOperationMode = readStruct(fb, "h", 8)
-        self.lActualAcqLength = readStruct(fb, "i", 10)
-        self.nNumPointsIgnored = readStruct(fb, "h", 14)
-        self.lActualEpisodes = readStruct(fb, "i", 16)
-        self.lFileStartDate = readStruct(fb, "i", 20)
-        self.lFileStartTime = readStruct(fb, "i", 24)
-        self.lStopwatchTime =  readStruct(fb, "i", 28)
-        self.fHeaderVersionNumber = readStruct(fb, "f", 32)
-        self.nFileType = readStruct(fb, "h", 36)
-        self.nMSBinFormat = readStruct(fb, "h", 38)
-
-        # GROUP 2 - File Structure (78 bytes)
-        self.lDataSectionPtr = readStruct(fb, "i", 40)
-        self.lTagSectionPtr = readStruct(fb, "i", 44)
-        self.lNumTagEntries = readStruct(fb, "i", 48)
-
-        # missing entries
-
-        self.lSynchArrayPtr = readStruct(fb, "i", 92)
-        self.lSynchArraySize = readStruct(fb, "i", 96)
-        self.nDataFormat = readStruct(fb, "h", 100)
-
-        # missing entries
-
-        # GROUP 3 - Trial hierarchy information (82 bytes)
-        self.nADCNumChannels = readStruct(fb, "h", 120)
-        self.fADCSampleInterval = readStruct(fb, "f", 122)
-        # missing entries
-        self.fSynchTimeUnit = readStruct(fb, "f", 130)
-        # missing entries
-        self.lNumSamplesPerEpisode = readStruct(fb, "i", 138)
-        self.lPreTriggerSamples = readStruct(fb, "i", 142)
-        self.lEpisodesPerRun = readStruct(fb, "i", 146)
-        # missing entries
-
-        # GROUP 4 - Display Parameters (44 bytes)
-        # missing entries
-
-        # GROUP 5 - Hardware information (16 bytes)
-        self.fADCRange = readStruct(fb, "f", 244)
-        self.fDACRange = readStruct(fb, "f", 248)
-        self.lADCResolution = readStruct(fb, "i", 252)
-        self.lDACResolution = readStruct(fb, "i", 256)
-
-        # GROUP 6 - Environmental Information (118 bytes)
-        self.nExperimentType = readStruct(fb, "h", 260)
-        # missing entries
-        self.sCreatorInfo = readStruct(fb, "16s", 294)
-        self.sFileCommentOld = readStruct(fb, "56s", 310)
-        self.nFileStartMillisecs = readStruct(fb, "h", 366)
-        # missing entries
-
-        # GROUP 7 - Multi-channel information (1044 bytes)
-        self.nADCPtoLChannelMap = readStruct(fb, "16h", 378)
-        self.nADCSamplingSeq = readStruct(fb, "16h", 410)
-        self.sADCChannelName = readStruct(fb, "10s"*16, 442)
-        self.sADCUnits = readStruct(fb, "8s"*16, 602)
-        self.fADCProgrammableGain = readStruct(fb, "16f", 730)
-        # missing entries
-        self.fInstrumentScaleFactor = readStruct(fb, "16f", 922)
-        self.fInstrumentOffset = readStruct(fb, "16f", 986)
-        self.fSignalGain = readStruct(fb, "16f", 1050)
-        self.fSignalOffset = readStruct(fb, "16f", 1114)
-        self.sDACChannelName = readStruct(fb, "10s"*4, 1306)
-        self.sDACChannelUnit = readStruct(fb, "8s"*4, 1346)
-        # missing entries
-
-        # GROUP 8 - Synchronous timer outputs (14 bytes)
-        # missing entries
-        # GROUP 9 - Epoch Waveform and Pulses (184 bytes)
-        self.nDigitalEnable = readStruct(fb, "h", 1436)
-        # missing entries
-        self.nActiveDACChannel = readStruct(fb, "h", 1440)
-        # missing entries
-        self.nDigitalHolding = readStruct(fb, "h", 1584)
-        self.nDigitalInterEpisode = readStruct(fb, "h", 1586)
-        # missing entries
-        self.nDigitalValue = readStruct(fb, "10h", 1588)
-
-        # GROUP 10 - DAC Output File (98 bytes)
-        # missing entries
-        # GROUP 11 - Presweep (conditioning) pulse train (44 bytes)
-        # missing entries
-        # GROUP 13 - Autopeak measurement (36 bytes)
-        # missing entries
-        # GROUP 14 - Channel Arithmetic (52 bytes)
-        # missing entries
-        # GROUP 15 - On-line subtraction (34 bytes)
-        # missing entries
-        # GROUP 16 - Miscellaneous variables (82 bytes)
-        # missing entries
-        # EXTENDED GROUP 2 - File Structure (16 bytes)
-        self.lDACFilePtr = readStruct(fb, "2i", 2048)
-        self.lDACFileNumEpisodes = readStruct(fb, "2i", 2056)
-        # EXTENDED GROUP 3 - Trial Hierarchy
-        # missing entries
-        # EXTENDED GROUP 7 - Multi-channel information (62 bytes)
-        self.fDACCalibrationFactor = readStruct(fb, "4f", 2074)
-        self.fDACCalibrationOffset = readStruct(fb, "4f", 2090)
-
-        # GROUP 17 - Trains parameters (160 bytes)
-        # missing entries
-        # EXTENDED GROUP 9 - Epoch Waveform and Pulses (412 bytes)
-        self.nWaveformEnable = readStruct(fb, "2h", 2296)
-        self.nWaveformSource = readStruct(fb, "2h", 2300)
-        self.nInterEpisodeLevel = readStruct(fb, "2h", 2304)
-        self.nEpochType = readStruct(fb, "20h", 2308)
-        self.fEpochInitLevel = readStruct(fb, "20f", 2348)
-        self.fEpochLevelInc = readStruct(fb, "20f", 2428)
-        self.lEpochInitDuration = readStruct(fb, "20i", 2508)
-        self.lEpochDurationInc = readStruct(fb, "20i", 2588)
-        # missing entries
-
-        # EXTENDED GROUP 10 - DAC Output File (552 bytes)
-        self.fDACFileScale = readStruct(fb, "2f", 2708)
-        self.fDACFileOffset = readStruct(fb, "2f", 2716)
-        self.lDACFileEpisodeNum = readStruct(fb, "2i", 2724)
-        self.nDACFileADCNum = readStruct(fb, "2h", 2732)
-        self.sDACFilePath = readStruct(fb, "256s"*2, 2736)
-        # EXTENDED GROUP 11 - Presweep (conditioning) pulse train (100 bytes)
-        # missing entries
-        # EXTENDED GROUP 12 - Variable parameter user list (1096 bytes)
-        # missing entries
-        # EXTENDED GROUP 15 - On-line subtraction (56 bytes)
-        # missing entries
-        # EXTENDED GROUP 6 Environmental Information  (898 bytes)
-        self.nTelegraphEnable = readStruct(fb, "16h", 4512)
-        self.nTelegraphInstrument = readStruct(fb, "16h", 4544)
-        self.fTelegraphAdditGain = readStruct(fb, "16f", 4576)
-        self.fTelegraphFilter = readStruct(fb, "16f", 4640)
-        self.fTelegraphMembraneCap = readStruct(fb, "16f", 4704)
-        self.nTelegraphMode = readStruct(fb, "16h", 4768)
-        self.nTelegraphDACScaleFactorEnable = readStruct(fb, "4h", 4800)
-        # missing entries
-        self.sProtocolPath = readStruct(fb, "256s", 4898)
-        self.sFileCommentNew = readStruct(fb, "128s", 5154)
-        self.fInstrumentHoldingLevel = readStruct(fb, "4f", 5298)
-        self.ulFileCRC = readStruct(fb, "I", 5314)
-        # missing entries
-        self.nCreatorMajorVersion = readStruct(fb, "h", 5798)
-        self.nCreatorMinorVersion = readStruct(fb, "h", 5800)
-        self.nCreatorBugfixVersion = readStruct(fb, "h", 5802)
-        self.nCreatorBuildVersion = readStruct(fb, "h", 5804)
-
-        # EXTENDED GROUP 13 - Statistics measurements (388 bytes)
-        # missing entries
-        # GROUP 18 - Application version data (16 bytes)
-        self.uFileGUID = readStruct(fb, "16B", 5282)
-        # missing entries
-        # GROUP 19 - LTP protocol (14 bytes)
-        # missing entries
-        # GROUP 20 - Digidata 132x Trigger out flag. (8 bytes)
-        # missing entries
-        # GROUP 21 - Epoch resistance (56 bytes) // TODO old value of 40 correct??
-        # missing entries
-        # GROUP 22 - Alternating episodic mode (58 bytes)
-        # missing entries
-        # GROUP 23 - Post-processing actions (210 bytes)
-        # missing entries
+        fb.seek(0)
+        headerBytes = fb.read(HEADERV1_LAYOUT.size)
+        self.__dict__.update(HEADERV1_LAYOUT.unpack(headerBytes))
 
         # format version number
         versionParts = list(str(int(self.fFileVersionNumber*1000)))
@@ -341,14 +447,33 @@ class HeaderV1:
             self.abfDateTimeString = "ERROR"
 
         # read tags into memory
-        self.lTagTime = [None]*self.lNumTagEntries
-        self.sTagComment = [None]*self.lNumTagEntries
-        self.nTagType = [None]*self.lNumTagEntries
-        for i in range(self.lNumTagEntries):
-            fb.seek(self.lTagSectionPtr*BLOCKSIZE + i * 64)
-            self.lTagTime[i]    = readStruct(fb, "i")
-            self.sTagComment[i] = readStruct(fb, "56s")
-            self.nTagType[i]    = readStruct(fb, "h")
+        tags = readEntries(fb, TAGV1_LAYOUT, self.lTagSectionPtr*BLOCKSIZE,
+                           TAGV1_ENTRY_SIZE, self.lNumTagEntries)
+        self.lTagTime = tags["lTagTime"]
+        self.sTagComment = tags["sTagComment"]
+        self.nTagType = tags["nTagType"]
+
+
+HEADERV2_LAYOUT = StructLayout([
+    ["sFileSignature", "4s", 0],
+    ["fFileVersionNumber", "4b", 4],
+    ["uFileInfoSize", "I", 8],
+    ["lActualEpisodes", "I", 12],
+    ["uFileStartDate", "I", 16],
+    ["uFileStartTimeMS", "I", 20],
+    ["uStopwatchTime", "I", 24],
+    ["nFileType", "H", 28],
+    ["nDataFormat", "H", 30],
+    ["nSimultaneousScan", "H", 32],
+    ["nCRCEnable", "H", 34],
+    ["uFileCRC", "I", 36],
+    ["uFileGUID", "16B", 40],
+    ["uCreatorVersion", "4B", 56],
+    ["uCreatorNameIndex", "I", 60],
+    ["uModifierVersion", "I", 64],
+    ["uModifierNameIndex", "I", 68],
+    ["uProtocolPathIndex", "I", 72],
+])
 
 
 class HeaderV2:
@@ -359,24 +484,8 @@ class HeaderV2:
 
     def __init__(self, fb):
         fb.seek(0)
-        self.sFileSignature = readStruct(fb, "4s")  # 0
-        self.fFileVersionNumber = readStruct(fb, "4b")  # 4
-        self.uFileInfoSize = readStruct(fb, "I")  # 8
-        self.lActualEpisodes = readStruct(fb, "I")  # 12
-        self.uFileStartDate = readStruct(fb, "I")  # 16
-        self.uFileStartTimeMS = readStruct(fb, "I")  # 20
-        self.uStopwatchTime = readStruct(fb, "I")  # 24
-        self.nFileType = readStruct(fb, "H")  # 28
-        self.nDataFormat = readStruct(fb, "H")  # 30
-        self.nSimultaneousScan = readStruct(fb, "H")  # 32
-        self.nCRCEnable = readStruct(fb, "H")  # 34
-        self.uFileCRC = readStruct(fb, "I")  # 36
-        self.uFileGUID = readStruct(fb, "16B")  # 40
-        self.uCreatorVersion = readStruct(fb, "4B")  # 56
-        self.uCreatorNameIndex = readStruct(fb, "I")  # 60
-        self.uModifierVersion = readStruct(fb, "I")  # 64
-        self.uModifierNameIndex = readStruct(fb, "I")  # 68
-        self.uProtocolPathIndex = readStruct(fb, "I")  # 72
+        headerBytes = fb.read(HEADERV2_LAYOUT.size)
+        self.__dict__.update(HEADERV2_LAYOUT.unpack(headerBytes))
 
         # format version number
         versionPartsInt = self.fFileVersionNumber[::-1]
@@ -425,6 +534,28 @@ class HeaderV2:
             self.abfDateTimeString = "ERROR"
 
 
+SECTIONMAP_LAYOUT = StructLayout([
+    ["ProtocolSection", "IIi", 76],
+    ["ADCSection", "IIi", 92],
+    ["DACSection", "IIi", 108],
+    ["EpochSection", "IIi", 124],
+    ["ADCPerDACSection", "IIi", 140],
+    ["EpochPerDACSection", "IIi", 156],
+    ["UserListSection", "IIi", 172],
+    ["StatsRegionSection", "IIi", 188],
+    ["MathSection", "IIi", 204],
+    ["StringsSection", "IIi", 220],
+    ["DataSection", "IIi", 236],
+    ["TagSection", "IIi", 252],
+    ["ScopeSection", "IIi", 268],
+    ["DeltaSection", "IIi", 284],
+    ["VoiceTagSection", "IIi", 300],
+    ["SynchArraySection", "IIi", 316],
+    ["AnnotationSection", "IIi", 332],
+    ["StatsSection", "IIi", 348],
+])
+
+
 class SectionMap:
     """
     Reading three numbers (int, int, long) at specific byte locations
@@ -436,24 +567,84 @@ class SectionMap:
     """
 
     def __init__(self, fb):
-        self.ProtocolSection = readStruct(fb, "IIi", 76)
-        self.ADCSection = readStruct(fb, "IIi", 92)
-        self.DACSection = readStruct(fb, "IIi", 108)
-        self.EpochSection = readStruct(fb, "IIi", 124)
-        self.ADCPerDACSection = readStruct(fb, "IIi", 140)
-        self.EpochPerDACSection = readStruct(fb, "IIi", 156)
-        self.UserListSection = readStruct(fb, "IIi", 172)
-        self.StatsRegionSection = readStruct(fb, "IIi", 188)
-        self.MathSection = readStruct(fb, "IIi", 204)
-        self.StringsSection = readStruct(fb, "IIi", 220)
-        self.DataSection = readStruct(fb, "IIi", 236)
-        self.TagSection = readStruct(fb, "IIi", 252)
-        self.ScopeSection = readStruct(fb, "IIi", 268)
-        self.DeltaSection = readStruct(fb, "IIi", 284)
-        self.VoiceTagSection = readStruct(fb, "IIi", 300)
-        self.SynchArraySection = readStruct(fb, "IIi", 316)
-        self.AnnotationSection = readStruct(fb, "IIi", 332)
-        self.StatsSection = readStruct(fb, "IIi", 348)
+        fb.seek(0)
+        headerBytes = fb.read(SECTIONMAP_LAYOUT.size)
+        self.__dict__.update(SECTIONMAP_LAYOUT.unpack(headerBytes))
+
+
+PROTOCOL_LAYOUT = StructLayout([
+    ["nOperationMode", "h", 0],
+    ["fADCSequenceInterval", "f", 2],
+    ["bEnableFileCompression", "b", 6],
+    ["sUnused", "3c", 7],
+    ["uFileCompressionRatio", "I", 10],
+    ["fSynchTimeUnit", "f", 14],
+    ["fSecondsPerRun", "f", 18],
+    ["lNumSamplesPerEpisode", "i", 22],
+    ["lPreTriggerSamples", "i", 26],
+    ["lEpisodesPerRun", "i", 30],
+    ["lRunsPerTrial", "i", 34],
+    ["lNumberOfTrials", "i", 38],
+    ["nAveragingMode", "h", 42],
+    ["nUndoRunCount", "h", 44],
+    ["nFirstEpisodeInRun", "h", 46],
+    ["fTriggerThreshold", "f", 48],
+    ["nTriggerSource", "h", 52],
+    ["nTriggerAction", "h", 54],
+    ["nTriggerPolarity", "h", 56],
+    ["fScopeOutputInterval", "f", 58],
+    ["fEpisodeStartToStart", "f", 62],
+    ["fRunStartToStart", "f", 66],
+    ["lAverageCount", "i", 70],
+    ["fTrialStartToStart", "f", 74],
+    ["nAutoTriggerStrategy", "h", 78],
+    ["fFirstRunDelayS", "f", 80],
+    ["nChannelStatsStrategy", "h", 84],
+    ["lSamplesPerTrace", "i", 86],
+    ["lStartDisplayNum", "i", 90],
+    ["lFinishDisplayNum", "i", 94],
+    ["nShowPNRawData", "h", 98],
+    ["fStatisticsPeriod", "f", 100],
+    ["lStatisticsMeasurements", "i", 104],
+    ["nStatisticsSaveStrategy", "h", 108],
+    ["fADCRange", "f", 110],
+    ["fDACRange", "f", 114],
+    ["lADCResolution", "i", 118],
+    ["lDACResolution", "i", 122],
+    ["nExperimentType", "h", 126],
+    ["nManualInfoStrategy", "h", 128],
+    ["nCommentsEnable", "h", 130],
+    ["lFileCommentIndex", "i", 132],
+    ["nAutoAnalyseEnable", "h", 136],
+    ["nSignalType", "h", 138],
+    ["nDigitalEnable", "h", 140],
+    ["nActiveDACChannel", "h", 142],
+    ["nDigitalHolding", "h", 144],
+    ["nDigitalInterEpisode", "h", 146],
+    ["nDigitalDACChannel", "h", 148],
+    ["nDigitalTrainActiveLogic", "h", 150],
+    ["nStatsEnable", "h", 152],
+    ["nStatisticsClearStrategy", "h", 154],
+    ["nLevelHysteresis", "h", 156],
+    ["lTimeHysteresis", "i", 158],
+    ["nAllowExternalTags", "h", 162],
+    ["nAverageAlgorithm", "h", 164],
+    ["fAverageWeighting", "f", 166],
+    ["nUndoPromptStrategy", "h", 170],
+    ["nTrialTriggerSource", "h", 172],
+    ["nStatisticsDisplayStrategy", "h", 174],
+    ["nExternalTagType", "h", 176],
+    ["nScopeTriggerOut", "h", 178],
+    ["nLTPType", "h", 180],
+    ["nAlternateDACOutputState", "h", 182],
+    ["nAlternateDigitalOutputState", "h", 184],
+    ["fCellID", "3f", 186],
+    ["nDigitizerADCs", "h", 198],
+    ["nDigitizerDACs", "h", 200],
+    ["nDigitizerTotalDigitalOuts", "h", 202],
+    ["nDigitizerSynchDigitalOuts", "h", 204],
+    ["nDigitizerType", "h", 206],
+])
 
 
 class ProtocolSection:
@@ -466,77 +657,8 @@ class ProtocolSection:
     def __init__(self, fb, sectionMap):
         seekTo = sectionMap.ProtocolSection[0]*BLOCKSIZE
         fb.seek(seekTo)
-        self.nOperationMode = readStruct(fb, "h")  # 0
-        self.fADCSequenceInterval = readStruct(fb, "f")  # 2
-        self.bEnableFileCompression = readStruct(fb, "b")  # 6
-        self.sUnused = readStruct(fb, "3c")  # 7
-        self.uFileCompressionRatio = readStruct(fb, "I")  # 10
-        self.fSynchTimeUnit = readStruct(fb, "f")  # 14
-        self.fSecondsPerRun = readStruct(fb, "f")  # 18
-        self.lNumSamplesPerEpisode = readStruct(fb, "i")  # 22
-        self.lPreTriggerSamples = readStruct(fb, "i")  # 26
-        self.lEpisodesPerRun = readStruct(fb, "i")  # 30
-        self.lRunsPerTrial = readStruct(fb, "i")  # 34
-        self.lNumberOfTrials = readStruct(fb, "i")  # 38
-        self.nAveragingMode = readStruct(fb, "h")  # 42
-        self.nUndoRunCount = readStruct(fb, "h")  # 44
-        self.nFirstEpisodeInRun = readStruct(fb, "h")  # 46
-        self.fTriggerThreshold = readStruct(fb, "f")  # 48
-        self.nTriggerSource = readStruct(fb, "h")  # 52
-        self.nTriggerAction = readStruct(fb, "h")  # 54
-        self.nTriggerPolarity = readStruct(fb, "h")  # 56
-        self.fScopeOutputInterval = readStruct(fb, "f")  # 58
-        self.fEpisodeStartToStart = readStruct(fb, "f")  # 62
-        self.fRunStartToStart = readStruct(fb, "f")  # 66
-        self.lAverageCount = readStruct(fb, "i")  # 70
-        self.fTrialStartToStart = readStruct(fb, "f")  # 74
-        self.nAutoTriggerStrategy = readStruct(fb, "h")  # 78
-        self.fFirstRunDelayS = readStruct(fb, "f")  # 80
-        self.nChannelStatsStrategy = readStruct(fb, "h")  # 84
-        self.lSamplesPerTrace = readStruct(fb, "i")  # 86
-        self.lStartDisplayNum = readStruct(fb, "i")  # 90
-        self.lFinishDisplayNum = readStruct(fb, "i")  # 94
-        self.nShowPNRawData = readStruct(fb, "h")  # 98
-        self.fStatisticsPeriod = readStruct(fb, "f")  # 100
-        self.lStatisticsMeasurements = readStruct(fb, "i")  # 104
-        self.nStatisticsSaveStrategy = readStruct(fb, "h")  # 108
-        self.fADCRange = readStruct(fb, "f")  # 110
-        self.fDACRange = readStruct(fb, "f")  # 114
-        self.lADCResolution = readStruct(fb, "i")  # 118
-        self.lDACResolution = readStruct(fb, "i")  # 122
-        self.nExperimentType = readStruct(fb, "h")  # 126
-        self.nManualInfoStrategy = readStruct(fb, "h")  # 128
-        self.nCommentsEnable = readStruct(fb, "h")  # 130
-        self.lFileCommentIndex = readStruct(fb, "i")  # 132
-        self.nAutoAnalyseEnable = readStruct(fb, "h")  # 136
-        self.nSignalType = readStruct(fb, "h")  # 138
-        self.nDigitalEnable = readStruct(fb, "h")  # 140
-        self.nActiveDACChannel = readStruct(fb, "h")  # 142
-        self.nDigitalHolding = readStruct(fb, "h")  # 144
-        self.nDigitalInterEpisode = readStruct(fb, "h")  # 146
-        self.nDigitalDACChannel = readStruct(fb, "h")  # 148
-        self.nDigitalTrainActiveLogic = readStruct(fb, "h")  # 150
-        self.nStatsEnable = readStruct(fb, "h")  # 152
-        self.nStatisticsClearStrategy = readStruct(fb, "h")  # 154
-        self.nLevelHysteresis = readStruct(fb, "h")  # 156
-        self.lTimeHysteresis = readStruct(fb, "i")  # 158
-        self.nAllowExternalTags = readStruct(fb, "h")  # 162
-        self.nAverageAlgorithm = readStruct(fb, "h")  # 164
-        self.fAverageWeighting = readStruct(fb, "f")  # 166
-        self.nUndoPromptStrategy = readStruct(fb, "h")  # 170
-        self.nTrialTriggerSource = readStruct(fb, "h")  # 172
-        self.nStatisticsDisplayStrategy = readStruct(fb, "h")  # 174
-        self.nExternalTagType = readStruct(fb, "h")  # 176
-        self.nScopeTriggerOut = readStruct(fb, "h")  # 178
-        self.nLTPType = readStruct(fb, "h")  # 180
-        self.nAlternateDACOutputState = readStruct(fb, "h")  # 182
-        self.nAlternateDigitalOutputState = readStruct(fb, "h")  # 184
-        self.fCellID = readStruct(fb, "3f")  # 186
-        self.nDigitizerADCs = readStruct(fb, "h")  # 198
-        self.nDigitizerDACs = readStruct(fb, "h")  # 200
-        self.nDigitizerTotalDigitalOuts = readStruct(fb, "h")  # 202
-        self.nDigitizerSynchDigitalOuts = readStruct(fb, "h")  # 204
-        self.nDigitizerType = readStruct(fb, "h")  # 206
+        sectionBytes = fb.read(PROTOCOL_LAYOUT.size)
+        self.__dict__.update(PROTOCOL_LAYOUT.unpack(sectionBytes))
 
         # additional useful information
         if self.nDigitizerType in DIGITIZERS.keys():
@@ -546,6 +668,37 @@ class ProtocolSection:
             self.sDigitizerType = DIGITIZERS[0]
 
 
+ADC_LAYOUT = StructLayout([
+    ["nADCNum", "h", 0],
+    ["nTelegraphEnable", "h", 2],
+    ["nTelegraphInstrument", "h", 4],
+    ["fTelegraphAdditGain", "f", 6],
+    ["fTelegraphFilter", "f", 10],
+    ["fTelegraphMembraneCap", "f", 14],
+    ["nTelegraphMode", "h", 18],
+    ["fTelegraphAccessResistance", "f", 20],
+    ["nADCPtoLChannelMap", "h", 24],
+    ["nADCSamplingSeq", "h", 26],
+    ["fADCProgrammableGain", "f", 28],
+    ["fADCDisplayAmplification", "f", 32],
+    ["fADCDisplayOffset", "f", 36],
+    ["fInstrumentScaleFactor", "f", 40],
+    ["fInstrumentOffset", "f", 44],
+    ["fSignalGain", "f", 48],
+    ["fSignalOffset", "f", 52],
+    ["fSignalLowpassFilter", "f", 56],
+    ["fSignalHighpassFilter", "f", 60],
+    ["nLowpassFilterType", "b", 64],
+    ["nHighpassFilterType", "b", 65],
+    ["fPostProcessLowpassFilter", "f", 66],
+    ["nPostProcessLowpassFilterType", "c", 70],
+    ["bEnabledDuringPN", "b", 71],
+    ["nStatsChannelPolarity", "h", 72],
+    ["lADCChannelNameIndex", "i", 74],
+    ["lADCUnitsIndex", "i", 78],
+])
+
+
 class ADCSection:
     """
     Information about the ADC (what gets recorded).
@@ -555,67 +708,11 @@ class ADCSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.ADCSection
         byteStart = blockStart*BLOCKSIZE
+        self.__dict__.update(readEntries(fb, ADC_LAYOUT, byteStart,
+                                         entrySize, entryCount))
 
-        self.nADCNum = [None]*entryCount
-        self.nTelegraphEnable = [None]*entryCount
-        self.nTelegraphInstrument = [None]*entryCount
         self.sTelegraphInstrument = [None]*entryCount
-        self.fTelegraphAdditGain = [None]*entryCount
-        self.fTelegraphFilter = [None]*entryCount
-        self.fTelegraphMembraneCap = [None]*entryCount
-        self.nTelegraphMode = [None]*entryCount
-        self.fTelegraphAccessResistance = [None]*entryCount
-        self.nADCPtoLChannelMap = [None]*entryCount
-        self.nADCSamplingSeq = [None]*entryCount
-        self.fADCProgrammableGain = [None]*entryCount
-        self.fADCDisplayAmplification = [None]*entryCount
-        self.fADCDisplayOffset = [None]*entryCount
-        self.fInstrumentScaleFactor = [None]*entryCount
-        self.fInstrumentOffset = [None]*entryCount
-        self.fSignalGain = [None]*entryCount
-        self.fSignalOffset = [None]*entryCount
-        self.fSignalLowpassFilter = [None]*entryCount
-        self.fSignalHighpassFilter = [None]*entryCount
-        self.nLowpassFilterType = [None]*entryCount
-        self.nHighpassFilterType = [None]*entryCount
-        self.fPostProcessLowpassFilter = [None]*entryCount
-        self.nPostProcessLowpassFilterType = [None]*entryCount
-        self.bEnabledDuringPN = [None]*entryCount
-        self.nStatsChannelPolarity = [None]*entryCount
-        self.lADCChannelNameIndex = [None]*entryCount
-        self.lADCUnitsIndex = [None]*entryCount
-
         for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            self.nADCNum[i] = readStruct(fb, "h")  # 0
-            self.nTelegraphEnable[i] = readStruct(fb, "h")  # 2
-            self.nTelegraphInstrument[i] = readStruct(fb, "h")  # 4
-            self.fTelegraphAdditGain[i] = readStruct(fb, "f")  # 6
-            self.fTelegraphFilter[i] = readStruct(fb, "f")  # 10
-            self.fTelegraphMembraneCap[i] = readStruct(fb, "f")  # 14
-            self.nTelegraphMode[i] = readStruct(fb, "h")  # 18
-            self.fTelegraphAccessResistance[i] = readStruct(fb, "f")  # 20
-            self.nADCPtoLChannelMap[i] = readStruct(fb, "h")  # 24
-            self.nADCSamplingSeq[i] = readStruct(fb, "h")  # 26
-            self.fADCProgrammableGain[i] = readStruct(fb, "f")  # 28
-            self.fADCDisplayAmplification[i] = readStruct(fb, "f")  # 32
-            self.fADCDisplayOffset[i] = readStruct(fb, "f")  # 36
-            self.fInstrumentScaleFactor[i] = readStruct(fb, "f")  # 40
-            self.fInstrumentOffset[i] = readStruct(fb, "f")  # 44
-            self.fSignalGain[i] = readStruct(fb, "f")  # 48
-            self.fSignalOffset[i] = readStruct(fb, "f")  # 52
-            self.fSignalLowpassFilter[i] = readStruct(fb, "f")  # 56
-            self.fSignalHighpassFilter[i] = readStruct(fb, "f")  # 60
-            self.nLowpassFilterType[i] = readStruct(fb, "b")  # 64
-            self.nHighpassFilterType[i] = readStruct(fb, "b")  # 65
-            self.fPostProcessLowpassFilter[i] = readStruct(fb, "f")  # 66
-            self.nPostProcessLowpassFilterType[i] = readStruct(fb, "c")  # 70
-            self.bEnabledDuringPN[i] = readStruct(fb, "b")  # 71
-            self.nStatsChannelPolarity[i] = readStruct(fb, "h")  # 72
-            self.lADCChannelNameIndex[i] = readStruct(fb, "i")  # 74
-            self.lADCUnitsIndex[i] = readStruct(fb, "i")  # 78
-
-            # useful information
             nTelegraphInstrument = self.nTelegraphInstrument[i]
             if nTelegraphInstrument in TELEGRAPHS.keys():
                 self.sTelegraphInstrument[i] = TELEGRAPHS[nTelegraphInstrument]
@@ -624,6 +721,51 @@ class ADCSection:
                 self.sTelegraphInstrument[i] = TELEGRAPHS[0]
 
 
+DAC_LAYOUT = StructLayout([
+    ["nDACNum", "h", 0],
+    ["nTelegraphDACScaleFactorEnable", "h", 2],
+    ["fInstrumentHoldingLevel", "f", 4],
+    ["fDACScaleFactor", "f", 8],
+    ["fDACHoldingLevel", "f", 12],
+    ["fDACCalibrationFactor", "f", 16],
+    ["fDACCalibrationOffset", "f", 20],
+    ["lDACChannelNameIndex", "i", 24],
+    ["lDACChannelUnitsIndex", "i", 28],
+    ["lDACFilePtr", "i", 32],
+    ["lDACFileNumEpisodes", "i", 36],
+    ["nWaveformEnable", "h", 40],
+    ["nWaveformSource", "h", 42],
+    ["nInterEpisodeLevel", "h", 44],
+    ["fDACFileScale", "f", 46],
+    ["fDACFileOffset", "f", 50],
+    ["lDACFileEpisodeNum", "i", 54],
+    ["nDACFileADCNum", "h", 58],
+    ["nConditEnable", "h", 60],
+    ["lConditNumPulses", "i", 62],
+    ["fBaselineDuration", "f", 66],
+    ["fBaselineLevel", "f", 70],
+    ["fStepDuration", "f", 74],
+    ["fStepLevel", "f", 78],
+    ["fPostTrainPeriod", "f", 82],
+    ["fPostTrainLevel", "f", 86],
+    ["nMembTestEnable", "h", 90],
+    ["nLeakSubtractType", "h", 92],
+    ["nPNPolarity", "h", 94],
+    ["fPNHoldingLevel", "f", 96],
+    ["nPNNumADCChannels", "h", 100],
+    ["nPNPosition", "h", 102],
+    ["nPNNumPulses", "h", 104],
+    ["fPNSettlingTime", "f", 106],
+    ["fPNInterpulse", "f", 110],
+    ["nLTPUsageOfDAC", "h", 114],
+    ["nLTPPresynapticPulses", "h", 116],
+    ["lDACFilePathIndex", "i", 118],
+    ["fMembTestPreSettlingTimeMS", "f", 122],
+    ["fMembTestPostSettlingTimeMS", "f", 126],
+    ["nLeakSubtractADCIndex", "h", 130],
+])
+
+
 class DACSection:
     """
     Information about the DAC (what gets clamped).
@@ -633,92 +775,21 @@ class DACSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.DACSection
         byteStart = blockStart*BLOCKSIZE
+        self.__dict__.update(readEntries(fb, DAC_LAYOUT, byteStart,
+                                         entrySize, entryCount))
 
-        self.nDACNum = [None]*entryCount
-        self.nTelegraphDACScaleFactorEnable = [None]*entryCount
-        self.fInstrumentHoldingLevel = [None]*entryCount
-        self.fDACScaleFactor = [None]*entryCount
-        self.fDACHoldingLevel = [None]*entryCount
-        self.fDACCalibrationFactor = [None]*entryCount
-        self.fDACCalibrationOffset = [None]*entryCount
-        self.lDACChannelNameIndex = [None]*entryCount
-        self.lDACChannelUnitsIndex = [None]*entryCount
-        self.lDACFilePtr = [None]*entryCount
-        self.lDACFileNumEpisodes = [None]*entryCount
-        self.nWaveformEnable = [None]*entryCount
-        self.nWaveformSource = [None]*entryCount
-        self.nInterEpisodeLevel = [None]*entryCount
-        self.fDACFileScale = [None]*entryCount
-        self.fDACFileOffset = [None]*entryCount
-        self.lDACFileEpisodeNum = [None]*entryCount
-        self.nDACFileADCNum = [None]*entryCount
-        self.nConditEnable = [None]*entryCount
-        self.lConditNumPulses = [None]*entryCount
-        self.fBaselineDuration = [None]*entryCount
-        self.fBaselineLevel = [None]*entryCount
-        self.fStepDuration = [None]*entryCount
-        self.fStepLevel = [None]*entryCount
-        self.fPostTrainPeriod = [None]*entryCount
-        self.fPostTrainLevel = [None]*entryCount
-        self.nMembTestEnable = [None]*entryCount
-        self.nLeakSubtractType = [None]*entryCount
-        self.nPNPolarity = [None]*entryCount
-        self.fPNHoldingLevel = [None]*entryCount
-        self.nPNNumADCChannels = [None]*entryCount
-        self.nPNPosition = [None]*entryCount
-        self.nPNNumPulses = [None]*entryCount
-        self.fPNSettlingTime = [None]*entryCount
-        self.fPNInterpulse = [None]*entryCount
-        self.nLTPUsageOfDAC = [None]*entryCount
-        self.nLTPPresynapticPulses = [None]*entryCount
-        self.lDACFilePathIndex = [None]*entryCount
-        self.fMembTestPreSettlingTimeMS = [None]*entryCount
-        self.fMembTestPostSettlingTimeMS = [None]*entryCount
-        self.nLeakSubtractADCIndex = [None]*entryCount
 
-        for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            self.nDACNum[i] = readStruct(fb, "h")  # 0
-            self.nTelegraphDACScaleFactorEnable[i] = readStruct(fb, "h")  # 2
-            self.fInstrumentHoldingLevel[i] = readStruct(fb, "f")  # 4
-            self.fDACScaleFactor[i] = readStruct(fb, "f")  # 8
-            self.fDACHoldingLevel[i] = readStruct(fb, "f")  # 12
-            self.fDACCalibrationFactor[i] = readStruct(fb, "f")  # 16
-            self.fDACCalibrationOffset[i] = readStruct(fb, "f")  # 20
-            self.lDACChannelNameIndex[i] = readStruct(fb, "i")  # 24
-            self.lDACChannelUnitsIndex[i] = readStruct(fb, "i")  # 28
-            self.lDACFilePtr[i] = readStruct(fb, "i")  # 32
-            self.lDACFileNumEpisodes[i] = readStruct(fb, "i")  # 36
-            self.nWaveformEnable[i] = readStruct(fb, "h")  # 40
-            self.nWaveformSource[i] = readStruct(fb, "h")  # 42
-            self.nInterEpisodeLevel[i] = readStruct(fb, "h")  # 44
-            self.fDACFileScale[i] = readStruct(fb, "f")  # 46
-            self.fDACFileOffset[i] = readStruct(fb, "f")  # 50
-            self.lDACFileEpisodeNum[i] = readStruct(fb, "i")  # 54
-            self.nDACFileADCNum[i] = readStruct(fb, "h")  # 58
-            self.nConditEnable[i] = readStruct(fb, "h")  # 60
-            self.lConditNumPulses[i] = readStruct(fb, "i")  # 62
-            self.fBaselineDuration[i] = readStruct(fb, "f")  # 66
-            self.fBaselineLevel[i] = readStruct(fb, "f")  # 70
-            self.fStepDuration[i] = readStruct(fb, "f")  # 74
-            self.fStepLevel[i] = readStruct(fb, "f")  # 78
-            self.fPostTrainPeriod[i] = readStruct(fb, "f")  # 82
-            self.fPostTrainLevel[i] = readStruct(fb, "f")  # 86
-            self.nMembTestEnable[i] = readStruct(fb, "h")  # 90
-            self.nLeakSubtractType[i] = readStruct(fb, "h")  # 92
-            self.nPNPolarity[i] = readStruct(fb, "h")  # 94
-            self.fPNHoldingLevel[i] = readStruct(fb, "f")  # 96
-            self.nPNNumADCChannels[i] = readStruct(fb, "h")  # 100
-            self.nPNPosition[i] = readStruct(fb, "h")  # 102
-            self.nPNNumPulses[i] = readStruct(fb, "h")  # 104
-            self.fPNSettlingTime[i] = readStruct(fb, "f")  # 106
-            self.fPNInterpulse[i] = readStruct(fb, "f")  # 110
-            self.nLTPUsageOfDAC[i] = readStruct(fb, "h")  # 114
-            self.nLTPPresynapticPulses[i] = readStruct(fb, "h")  # 116
-            self.lDACFilePathIndex[i] = readStruct(fb, "i")  # 118
-            self.fMembTestPreSettlingTimeMS[i] = readStruct(fb, "f")  # 122
-            self.fMembTestPostSettlingTimeMS[i] = readStruct(fb, "f")  # 126
-            self.nLeakSubtractADCIndex[i] = readStruct(fb, "h")  # 130
+EPOCHPERDAC_LAYOUT = StructLayout([
+    ["nEpochNum", "h", 0],
+    ["nDACNum", "h", 2],
+    ["nEpochType", "h", 4],
+    ["fEpochInitLevel", "f", 6],
+    ["fEpochLevelInc", "f", 10],
+    ["lEpochInitDuration", "i", 14],
+    ["lEpochDurationInc", "i", 18],
+    ["lEpochPulsePeriod", "i", 22],
+    ["lEpochPulseWidth", "i", 26],
+])
 
 
 class EpochPerDACSection:
@@ -731,28 +802,14 @@ class EpochPerDACSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.EpochPerDACSection
         byteStart = blockStart*BLOCKSIZE
+        self.__dict__.update(readEntries(fb, EPOCHPERDAC_LAYOUT, byteStart,
+                                         entrySize, entryCount))
 
-        self.nEpochNum = [None]*entryCount
-        self.nDACNum = [None]*entryCount
-        self.nEpochType = [None]*entryCount
-        self.fEpochInitLevel = [None]*entryCount
-        self.fEpochLevelInc = [None]*entryCount
-        self.lEpochInitDuration = [None]*entryCount
-        self.lEpochDurationInc = [None]*entryCount
-        self.lEpochPulsePeriod = [None]*entryCount
-        self.lEpochPulseWidth = [None]*entryCount
 
-        for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            self.nEpochNum[i] = readStruct(fb, "h")  # 0
-            self.nDACNum[i] = readStruct(fb, "h")  # 2
-            self.nEpochType[i] = readStruct(fb, "h")  # 4
-            self.fEpochInitLevel[i] = readStruct(fb, "f")  # 6
-            self.fEpochLevelInc[i] = readStruct(fb, "f")  # 10
-            self.lEpochInitDuration[i] = readStruct(fb, "i")  # 14
-            self.lEpochDurationInc[i] = readStruct(fb, "i")  # 18
-            self.lEpochPulsePeriod[i] = readStruct(fb, "i")  # 22
-            self.lEpochPulseWidth[i] = readStruct(fb, "i")  # 26
+EPOCH_LAYOUT = StructLayout([
+    ["nEpochNum", "h", 0],
+    ["nEpochDigitalOutput", "h", 2],
+])
 
 
 class EpochSection:
@@ -767,14 +824,16 @@ class EpochSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.EpochSection
         byteStart = blockStart*BLOCKSIZE
+        self.__dict__.update(readEntries(fb, EPOCH_LAYOUT, byteStart,
+                                         entrySize, entryCount))
 
-        self.nEpochNum = [None]*entryCount
-        self.nEpochDigitalOutput = [None]*entryCount
 
-        for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            self.nEpochNum[i] = readStruct(fb, "h")  # 0
-            self.nEpochDigitalOutput[i] = readStruct(fb, "h")  # 2
+TAG_LAYOUT = StructLayout([
+    ["lTagTime", "i", 0],
+    ["sComment", "56s", 4],
+    ["nTagType", "h", 60],
+    ["nVoiceTagNumberorAnnotationIndex", "h", 62],
+])
 
 
 class TagSection:
@@ -789,23 +848,13 @@ class TagSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.TagSection
         byteStart = blockStart*BLOCKSIZE
-
-        self.lTagTime = [None]*entryCount
-        self.sComment = [None]*entryCount
-        self.nTagType = [None]*entryCount
-        self.nVoiceTagNumberorAnnotationIndex = [None]*entryCount
+        self.__dict__.update(readEntries(fb, TAG_LAYOUT, byteStart,
+                                         entrySize, entryCount))
 
         self.timesSec = [None]*entryCount
         self.timesMin = [None]*entryCount
         self.sweeps = [None]*entryCount
 
-        for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            self.lTagTime[i] = readStruct(fb, "i")
-            self.sComment[i] = readStruct(fb, "56s")
-            self.nTagType[i] = readStruct(fb, "h")
-            self.nVoiceTagNumberorAnnotationIndex[i] = readStruct(fb, "h")
-
 
 class StringsSection:
     """
@@ -823,11 +872,11 @@ class StringsSection:
     def __init__(self, fb, sectionMap):
         blockStart, entrySize, entryCount = sectionMap.StringsSection
         byteStart = blockStart*BLOCKSIZE
+        fb.seek(byteStart)
+        sectionBytes = fb.read(entrySize*entryCount)
         self.strings = [None]*entryCount
         for i in range(entryCount):
-            fb.seek(byteStart + i*entrySize)
-            structFormat = "%ss" % entrySize
-            self.strings[i] = readStruct(fb, structFormat, cleanStrings=False)
+            self.strings[i] = sectionBytes[i*entrySize:(i+1)*entrySize]
 
 
 class StringsIndexed:
@@ -16,29 +16,215 @@ import logging
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
+# constants for ABF1 files
+BLOCKSIZE = 512
+FULL_HEADER_BLOCKS = 12  # large enough to hold every ABF1 header value
+MAX_CHANNELS = 16
+ADC_RESOLUTION = 2**15  # 16-bit signed = +/- 32768
+ADC_RANGE = 10
+RAW_COPY_CHUNK_BYTES = 1024 * 1024
+
+# per-channel ABF1 header values which determine how ADC values are scaled
+# (the ABF1 byte offset and format of each 16-element array)
+ADC_SCALING_FIELDS = [
+    ["fADCProgrammableGain", "f", 730],
+    ["fInstrumentScaleFactor", "f", 922],
+    ["fInstrumentOffset", "f", 986],
+    ["fSignalGain", "f", 1050],
+    ["fSignalOffset", "f", 1114],
+    ["nTelegraphEnable", "h", 4512],
+    ["fTelegraphAdditGain", "f", 4576],
+]
+
+
 def writeABF1(sweepData, filename, sampleRateHz, units='pA'):
     """
     Create an ABF1 file from scratch and write it to disk.
     Files created with this function are compatible with MiniAnalysis.
-    Data is expected to be a 2D numpy array (each row is a sweep).
+    Data is expected to be a 2D numpy array (each row is a sweep). To save
+    multiple channels use a 3D array (channel, sweep, point) and optionally
+    provide units as a list (one per channel).
     """
 
     assert isinstance(sweepData, np.ndarray)
-
-    # constants for ABF1 files
-    BLOCKSIZE = 512
-    HEADER_BLOCKS = 4
+    if sweepData.ndim == 2:
+        sweepData = sweepData[np.newaxis]
+    if sweepData.ndim != 3:
+        raise ValueError("sweepData must be a 2D or 3D array")
 
     # determine dimensions of data
-    sweepCount = sweepData.shape[0]
-    sweepPointCount = sweepData.shape[1]
-    dataPointCount = sweepPointCount*sweepCount
+    channelCount = sweepData.shape[0]
+    sweepCount = sweepData.shape[1]
+    sweepPointCount = sweepData.shape[2]
+    dataPointCount = sweepPointCount*sweepCount*channelCount
+    units = _unitsList(units, channelCount)
 
-    # predict how large our file must be and create a byte array of that size
+    # predict how large our file will be
     bytesPerPoint = 2
     dataBlocks = int(dataPointCount * bytesPerPoint / BLOCKSIZE) + 1
-    data = bytearray((dataBlocks + HEADER_BLOCKS) * BLOCKSIZE)
-    log.info("Creating an ABF1 file %.02f MB in size ..." % (len(data)/1e6))
+    fileSize = (dataBlocks + FULL_HEADER_BLOCKS) * BLOCKSIZE
+    log.info("Creating an ABF1 file %.02f MB in size ..." % (fileSize/1e6))
+
+    # each channel gets the largest scaling factor which fits its data
+    scaleFactors = []
+    for channel in range(channelCount):
+        maxVal = np.max(np.abs(sweepData[channel]))
+        log.debug("maximum data value: %f" % (maxVal))
+        scaleFactors.append(_instrumentScaleFactor(maxVal))
+
+    data = _headerABF1(sampleRateHz, channelCount, sweepCount,
+                       sweepPointCount, units, scaleFactors,
+                       FULL_HEADER_BLOCKS)
+
+    # scale data to int16 with points of each sweep interleaved by channel
+    scaled, clippedPointCount = _scaleToInt16(np.moveaxis(sweepData, 0, 2),
+                                              scaleFactors)
+    dataBytes = scaled.tobytes()
+    padBytes = fileSize - len(data) - len(dataBytes)
+
+    # save the byte array to disk
+    with open(filename, 'wb') as f:
+        f.write(data)
+        f.write(dataBytes)
+        f.write(bytes(padBytes))
+        log.info("wrote %s" % (filename))
+    return
+
+
+class ABFWriter:
+    """
+    Create an ABF1 file one piece at a time. The header is written when the
+    file is created, data is appended with write() (which accepts any number
+    of points) or writeSweeps() (which accepts an iterable of sweeps), and the
+    header is updated to reflect the amount of data written when the file is
+    closed. Memory use does not depend on the size of the file.
+
+        with pyabf.abfWriter.ABFWriter("demo.abf", 20000, 5000) as writer:
+            for sweepY in generateSweeps():
+                writer.write(sweepY)
+
+    Values are stored as 16-bit integers, so the largest absolute value of
+    each channel must be known in advance (maxValue). If it is not given it is
+    determined from the first data written, and larger values written later
+    will be clipped. If sweepPointCount is None a gap-free file is created.
+    """
+
+    def __init__(self, filename, sampleRateHz, sweepPointCount=None,
+                 units='pA', channelCount=1, maxValue=None):
+        self.filename = os.path.abspath(filename)
+        self.sampleRateHz = sampleRateHz
+        self.sweepPointCount = sweepPointCount
+        self.channelCount = channelCount
+        self.units = _unitsList(units, channelCount)
+        self.pointsWritten = 0
+        self.clippedPointCount = 0
+
+        self._scaleFactors = None
+        if maxValue is not None:
+            if np.isscalar(maxValue):
+                maxValue = [maxValue] * channelCount
+            self._scaleFactors = [_instrumentScaleFactor(x) for x in maxValue]
+
+        self._file = open(self.filename, 'wb')
+        self._writeHeader()
+        log.debug("writing %s" % (self.filename))
+
+    def __repr__(self):
+        return 'ABFWriter("%s") with %d points written' % (
+            self.filename, self.pointsWritten)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _writeHeader(self):
+        """Write (or re-write) the header at the start of the file."""
+        scaleFactors = self._scaleFactors or [1] * self.channelCount
+        if self.sweepPointCount:
+            sweepCount = self.pointsWritten // self.sweepPointCount
+            sweepPointCount = self.sweepPointCount
+        else:
+            sweepCount = 1
+            sweepPointCount = self.pointsWritten
+        header = _headerABF1(self.sampleRateHz, self.channelCount, sweepCount,
+                             sweepPointCount, self.units, scaleFactors,
+                             FULL_HEADER_BLOCKS)
+        if not self.sweepPointCount:
+            struct.pack_into('h', header, 8, 3)  # nOperationMode (gap-free)
+        self._file.seek(0)
+        self._file.write(header)
+
+    def write(self, data):
+        """
+        Append data to the file. Data may be a 1D array (single channel files)
+        or a 2D array (channel, point) of any length.
+        """
+        if self._file.closed:
+            raise ValueError("cannot write to a closed ABFWriter")
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[np.newaxis]
+        if data.shape[0] != self.channelCount:
+            raise ValueError("data must have %d channels" % self.channelCount)
+
+        if self._scaleFactors is None:
+            maxValues = np.max(np.abs(data), axis=1)
+            self._scaleFactors = [_instrumentScaleFactor(x)
+                                  for x in maxValues]
+
+        scaled, clippedPointCount = _scaleToInt16(data.T, self._scaleFactors)
+        self.clippedPointCount += clippedPointCount
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(scaled.tobytes())
+        self.pointsWritten += data.shape[1]
+
+    def writeSweeps(self, sweeps):
+        """Append every sweep from an iterable (such as a generator)."""
+        for sweepData in sweeps:
+            if self.sweepPointCount:
+                if np.shape(sweepData)[-1] != self.sweepPointCount:
+                    raise ValueError("sweeps must have %d points" %
+                                     self.sweepPointCount)
+            self.write(sweepData)
+
+    def close(self):
+        """
+        Finish the file: pad any incomplete sweep with zeros, update the header
+        to describe the data written, and close the file.
+        """
+        if self._file.closed:
+            return
+        if self.sweepPointCount and self.pointsWritten % self.sweepPointCount:
+            missingPoints = self.sweepPointCount - \
+                self.pointsWritten % self.sweepPointCount
+            log.warning("padding last sweep with %d zeros" % missingPoints)
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(bytes(missingPoints * self.channelCount * 2))
+            self.pointsWritten += missingPoints
+        if self.clippedPointCount:
+            log.warning("%d values were clipped (exceeded maxValue)" %
+                        self.clippedPointCount)
+
+        self._writeHeader()
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(bytes(-self._file.tell() % BLOCKSIZE))
+        self._file.close()
+        log.info("wrote %s" % (self.filename))
+
+
+def _headerABF1(sampleRateHz, channelCount, sweepCount, sweepPointCount,
+                units, scaleFactors, headerBlocks=FULL_HEADER_BLOCKS):
+    """
+    Return the header of an ABF1 file (a bytearray headerBlocks in size)
+    describing int16 data of the given dimensions.
+    """
+    if channelCount > MAX_CHANNELS:
+        raise ValueError("ABF1 files cannot have more than %d channels" %
+                         MAX_CHANNELS)
+    dataPointCount = sweepPointCount*sweepCount*channelCount
+    data = bytearray(headerBlocks * BLOCKSIZE)
 
     # populate only the useful header data values
     struct.pack_into('4s', data, 0, b'ABF ')  # fFileSignature
@@ -46,11 +232,13 @@ def writeABF1(sweepData, filename, sampleRateHz, units='pA'):
     struct.pack_into('h', data, 8, 5)  # nOperationMode (5 is episodic)
     struct.pack_into('i', data, 10, dataPointCount)  # lActualAcqLength
     struct.pack_into('i', data, 16, sweepCount)  # lActualEpisodes
-    struct.pack_into('i', data, 40, HEADER_BLOCKS)  # lDataSectionPtr
+    struct.pack_into('i', data, 40, headerBlocks)  # lDataSectionPtr
     struct.pack_into('h', data, 100, 0)  # nDataFormat is 1 for float32
-    struct.pack_into('h', data, 120, 1)  # nADCNumChannels
-    struct.pack_into('f', data, 122, 1e6 / sampleRateHz)  # fADCSampleInterval
-    struct.pack_into('i', data, 138, sweepPointCount)  # lNumSamplesPerEpisode
+    struct.pack_into('h', data, 120, channelCount)  # nADCNumChannels
+    struct.pack_into('f', data, 122, 1e6 / sampleRateHz /
+                     channelCount)  # fADCSampleInterval
+    struct.pack_into('i', data, 138, sweepPointCount *
+                     channelCount)  # lNumSamplesPerEpisode
 
     # These ADC adjustments are used for integer conversion. It's a good idea
     # to populate these with non-zero values even when using float32 notation
@@ -58,58 +246,167 @@ def writeABF1(sweepData, filename, sampleRateHz, units='pA'):
 
     fSignalGain = 1  # always 1
     fADCProgrammableGain = 1  # always 1
-    lADCResolution = 2**15  # 16-bit signed = +/- 32768
 
-    # determine the peak data deviation from zero
-    maxVal = np.max(np.abs(sweepData))
-    log.debug("maximum data value: %f"%(maxVal))
+    # store the scale data in the header
+    struct.pack_into('i', data, 252, ADC_RESOLUTION)  # lADCResolution
+    struct.pack_into('f', data, 244, ADC_RANGE)  # fADCRange
+    for i in range(MAX_CHANNELS):
+        channel = i if i < channelCount else 0
+        struct.pack_into('h', data, 378+i*2, i)  # nADCPtoLChannelMap
+        struct.pack_into('h', data, 410+i*2, i)  # nADCSamplingSeq
+        struct.pack_into('f', data, 922+i*4, scaleFactors[channel])
+        struct.pack_into('f', data, 1050+i*4, fSignalGain)
+        struct.pack_into('f', data, 730+i*4, fADCProgrammableGain)
+        struct.pack_into('8s', data, 602+i*8, _unitString(units[channel]))
+
+    return data
+
+
+def writeABF1Raw(abf, filename, sampleRateHz=None, sweeps=None,
+                 channels=None, timeSec1=None, timeSec2=None):
+    """
+    Save an ABF (with int16 data) as an ABF1 file by copying its ADC values
+    byte for byte and carrying over the header values used to scale them, so
+    the new file contains exactly the same data as the original.
+
+    A subset of the ABF may be saved by providing a list of sweeps, a list of
+    channels, and/or two times (seconds from the start of each sweep). Data
+    is copied in chunks, so memory use does not depend on the size of the
+    file and values are never converted to floating-point numbers.
+    """
+    if abf._dtype != np.int16:
+        raise ValueError("raw copies require an ABF with int16 data")
+    if sampleRateHz is None:
+        sampleRateHz = abf.dataRate
+    if sweeps is None:
+        sweeps = abf.sweepList
+    if channels is None:
+        channels = abf.channelList
+    for sweep in sweeps:
+        if not sweep in abf.sweepList:
+            msg = "Sweep %d not available (must be 0 - %d)" % (
+                sweep, abf.sweepCount-1)
+            raise ValueError(msg)
+    for channel in channels:
+        if not channel in abf.channelList:
+            msg = "Channel %d not available (must be 0 - %d)" % (
+                channel, abf.channelCount-1)
+            raise ValueError(msg)
+
+    # determine the range of points to copy from each sweep
+    pointStart, pointEnd = 0, abf.sweepPointCount
+    if timeSec1 is not None:
+        pointStart = max(0, int(timeSec1*abf.dataRate))
+    if timeSec2 is not None:
+        pointEnd = min(pointEnd, int(timeSec2*abf.dataRate))
+    if pointEnd <= pointStart:
+        raise ValueError("timeSec2 must be greater than timeSec1")
+
+    header = _headerABF1(sampleRateHz, len(channels), len(sweeps),
+                         pointEnd - pointStart,
+                         [abf.adcUnits[x] for x in channels],
+                         [1] * len(channels), FULL_HEADER_BLOCKS)
+    if _operationMode(abf) == 3:
+        struct.pack_into('h', header, 8, 3)  # nOperationMode (gap-free)
+    _packADCScaling(header, abf, channels)
+
+    # copy (in chunks) the byte range of every sweep without interpreting it
+    frameBytes = abf.channelCount * 2
+    framesPerChunk = max(1, RAW_COPY_CHUNK_BYTES // frameBytes)
+    allChannels = list(channels) == abf.channelList
+    with open(abf.abfFilePath, 'rb') as fbIn, open(filename, 'wb') as fbOut:
+        fbOut.write(header)
+        for sweep in sweeps:
+            frame = sweep * abf.sweepPointCount + pointStart
+            frameEnd = sweep * abf.sweepPointCount + pointEnd
+            fbIn.seek(abf.dataByteStart + frame * frameBytes)
+            while frame < frameEnd:
+                frameCount = min(framesPerChunk, frameEnd - frame)
+                chunk = fbIn.read(frameCount * frameBytes)
+                if len(chunk) != frameCount * frameBytes:
+                    raise ValueError("ABF data section is incomplete")
+                if not allChannels:
+                    chunk = np.frombuffer(chunk, '<i2')
+                    chunk = chunk.reshape(-1, abf.channelCount)[:, channels]
+                    chunk = chunk.tobytes()
+                fbOut.write(chunk)
+                frame += frameCount
+        fbOut.write(bytes(-fbOut.tell() % BLOCKSIZE))
+    log.info("wrote %s" % (filename))
+
+
+def _operationMode(abf):
+    """Return the nOperationMode of an ABF1 or ABF2 file."""
+    if abf.abfVersion["major"] == 1:
+        return abf._headerV1.nOperationMode
+    return abf._protocolSection.nOperationMode
+
 
-    # set the scaling factor to be the biggest allowable to accomodate the data
+def _packADCScaling(header, abf, channels):
+    """
+    Copy the values which determine how ADC values of the given channels are
+    scaled from an ABF1 or ABF2 file into an ABF1 header.
+    """
+    if abf.abfVersion["major"] == 1:
+        adcHeader = abf._headerV1
+        protocolHeader = abf._headerV1
+    else:
+        adcHeader = abf._adcSection
+        protocolHeader = abf._protocolSection
+    struct.pack_into('i', header, 252, protocolHeader.lADCResolution)
+    struct.pack_into('f', header, 244, protocolHeader.fADCRange)
+    for name, fieldFormat, byteOffset in ADC_SCALING_FIELDS:
+        values = getattr(adcHeader, name)
+        fieldSize = struct.calcsize(fieldFormat)
+        for i, channel in enumerate(channels):
+            struct.pack_into(fieldFormat, header,
+                             byteOffset + i * fieldSize, values[channel])
+
+
+def _instrumentScaleFactor(maxVal):
+    """
+    Return the biggest scaling factor (a power of 10) which can represent
+    values as large as maxVal as 16-bit integers.
+    """
     fInstrumentScaleFactor = 100
     for i in range(10):
         fInstrumentScaleFactor /= 10
-        fADCRange = 10
-        valueScale = lADCResolution / fADCRange * fInstrumentScaleFactor
+        valueScale = ADC_RESOLUTION / ADC_RANGE * fInstrumentScaleFactor
         maxDeviationFromZero = 32767 / valueScale
-        if (maxDeviationFromZero<maxVal):
-            log.debug("scaling factor %f is too small (max %f)"%(valueScale, 
-                maxDeviationFromZero))
+        if (maxDeviationFromZero < maxVal):
+            log.debug("scaling factor %f is too small (max %f)" % (
+                valueScale, maxDeviationFromZero))
         else:
-            log.debug("scaling factor %f will be used"%(valueScale))
+            log.debug("scaling factor %f will be used" % (valueScale))
             break
-        
-    log.debug("maximum allowed data value: %f"%(maxDeviationFromZero))
-    log.debug("first value (float): %f"%(sweepData[0][0]))
-    log.debug("first value (scaled int): %f"%(int(sweepData[0][0]*valueScale)))
+    return fInstrumentScaleFactor
 
-    # prepare units as a space-padded 8-byte string
-    unitString = units
-    while len(unitString)<8:
-        unitString = unitString + " "
 
-    # store the scale data in the header
-    struct.pack_into('i', data, 252, lADCResolution)
-    struct.pack_into('f', data, 244, fADCRange)
-    for i in range(16):
-        struct.pack_into('f', data, 922+i*4, fInstrumentScaleFactor)
-        struct.pack_into('f', data, 1050+i*4, fSignalGain)
-        struct.pack_into('f', data, 730+i*4, fADCProgrammableGain)
-        struct.pack_into('8s', data, 602+i*8, unitString.encode())
+def _scaleToInt16(data, scaleFactors):
+    """
+    Return data (with channels as the last axis) scaled, rounded, and clipped
+    to little-endian 16-bit integers as well as the number of clipped values.
+    """
+    valueScales = np.array(scaleFactors) * ADC_RESOLUTION / ADC_RANGE
+    scaled = np.multiply(data, valueScales, dtype=np.float64)
+    np.round(scaled, out=scaled)
+    clippedPointCount = np.count_nonzero(np.abs(scaled) > 32767)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return [scaled.astype('<i2'), clippedPointCount]
 
-    # fill data portion with scaled data from signal
-    dataByteOffset = BLOCKSIZE * HEADER_BLOCKS
-    for sweepNumber, sweepSignal in enumerate(sweepData):
-        sweepByteOffset = sweepNumber * sweepPointCount * bytesPerPoint
-        for valueNumber, value in enumerate(sweepSignal):
-            valueByteOffset = valueNumber * bytesPerPoint
-            bytePosition = dataByteOffset + sweepByteOffset + valueByteOffset
-            struct.pack_into('h', data, bytePosition, int(value*valueScale))
 
-    # save the byte array to disk
-    with open(filename, 'wb') as f:
-        f.write(data)
-        log.info("wrote %s"%(filename))
-    return
+def _unitsList(units, channelCount):
+    """Return units as a list with one string per channel."""
+    if isinstance(units, str):
+        units = [units] * channelCount
+    if len(units) != channelCount:
+        raise ValueError("units must be given for each channel")
+    return list(units)
+
+
+def _unitString(units):
+    """Return units as a space-padded 8-byte string."""
+    return units[:8].ljust(8).encode()
 
 
 def _demo_sweep_data(sweeps=3, sweepLengthSec=5, sampleRate=20000):
@@ -0,0 +1,249 @@
+"""
+Code here builds a catalog of ABF header information stored in a SQLite
+database. Scanning a folder reads headers (not data) of all ABFs in parallel,
+and subsequent scans only re-read files whose size or modification time has
+changed. Searches (e.g., by protocol or recording date) are answered from the
+database without opening any ABF files.
+
+Example:
+    catalog = pyabf.catalog.Catalog("abfs.db")
+    catalog.scan("X:/Data/")
+    for abfInfo in catalog.query(protocol="0201 memtest"):
+        print(abfInfo["path"], abfInfo["abfDateTime"])
+"""
+
+import os
+import json
+import sqlite3
+import datetime
+import logging
+import concurrent.futures
+import pyabf
+
+log = logging.getLogger(__name__)
+
+# header-derived values stored for every ABF (in addition to path/size/mtime)
+CATALOG_FIELDS = ["abfID", "protocol", "abfDateTime", "sweepCount",
+                  "channelCount", "dataRate", "adcUnits", "tags", "fileGUID"]
+
+# fields stored as JSON because they are lists
+CATALOG_LIST_FIELDS = ["adcUnits", "tags"]
+
+# dates are stored as strings in this format so they sort chronologically
+CATALOG_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS abfs (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    abfID TEXT,
+    protocol TEXT,
+    abfDateTime TEXT,
+    sweepCount INTEGER,
+    channelCount INTEGER,
+    dataRate REAL,
+    adcUnits TEXT,
+    tags TEXT,
+    fileGUID TEXT
+);
+CREATE INDEX IF NOT EXISTS abfs_protocol ON abfs (protocol);
+CREATE INDEX IF NOT EXISTS abfs_abfDateTime ON abfs (abfDateTime);
+CREATE TABLE IF NOT EXISTS failures (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL
+);
+"""
+
+
+def readHeaderFields(abfFilePath):
+    """
+    Return a dictionary of catalog fields read from the header of the given
+    ABF file. Returns None if the file could not be read as an ABF.
+    """
+    try:
+        abf = pyabf.ABF(abfFilePath, loadData=False)
+    except Exception as e:
+        log.warning("could not read %s (%s)" % (abfFilePath, e))
+        return None
+    fields = {}
+    fields["abfID"] = abf.abfID
+    fields["protocol"] = abf.protocol
+    fields["abfDateTime"] = _dateString(abf.abfDateTime)
+    fields["sweepCount"] = abf.sweepCount
+    fields["channelCount"] = abf.channelCount
+    fields["dataRate"] = abf.dataRate
+    fields["adcUnits"] = json.dumps(abf.adcUnits)
+    fields["tags"] = json.dumps(abf.tagComments)
+    fields["fileGUID"] = abf._fileGUID
+    return fields
+
+
+def findABFs(folder, recursive=True):
+    """Return a sorted list of paths to all ABF files in the given folder."""
+    abfFilePaths = []
+    for dirPath, dirNames, fileNames in os.walk(folder):
+        for fileName in fileNames:
+            if fileName.lower().endswith(".abf"):
+                abfFilePaths.append(os.path.join(dirPath, fileName))
+        if not recursive:
+            break
+    return sorted(abfFilePaths)
+
+
+class Catalog:
+    """
+    A SQLite database of ABF header information keyed by file path.
+    Files are re-parsed only when their size or modification time changes.
+    """
+
+    def __init__(self, databasePath):
+        self.databasePath = os.path.abspath(databasePath)
+        self._db = sqlite3.connect(self.databasePath)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(CATALOG_SCHEMA)
+
+    def __repr__(self):
+        return 'Catalog(%s) with %d ABFs' % (self.databasePath, len(self))
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM abfs").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the connection to the database."""
+        self._db.close()
+
+    def scan(self, folder, recursive=True, processes=None):
+        """
+        Add (or update) every ABF in the given folder. Headers are read in a
+        pool of processes (one per CPU unless processes is given), but only
+        for new files and files whose size or modification time changed.
+        Files which could not be read are remembered and not read again
+        until they change. Records of files which no longer exist in the
+        folder (or its subfolders if recursive) are removed. Returns the number of ABFs added or updated.
+        """
+        folder = os.path.abspath(folder)
+        known = {}
+        for table in ["abfs", "failures"]:
+            sql = "SELECT path, size, mtime FROM %s" % table
+            for row in self._db.execute(sql):
+                known[row["path"]] = (row["size"], row["mtime"])
+
+        changed = []
+        found = set()
+        for abfFilePath in findABFs(folder, recursive):
+            try:
+                stat = os.stat(abfFilePath)
+            except OSError:
+                continue  # deleted since the folder was listed
+            found.add(abfFilePath)
+            if known.get(abfFilePath) != (stat.st_size, stat.st_mtime):
+                changed.append([abfFilePath, stat.st_size, stat.st_mtime])
+
+        paths = [x[0] for x in changed]
+        headers = _readHeaders(paths, processes)
+
+        columns = ["path", "size", "mtime"] + CATALOG_FIELDS
+        sql = "INSERT OR REPLACE INTO abfs (%s) VALUES (%s)" % (
+            ", ".join(columns), ", ".join(["?"] * len(columns)))
+        sqlFailure = "INSERT OR REPLACE INTO failures VALUES (?, ?, ?)"
+        writtenCount = 0
+        with self._db:
+            for (abfFilePath, size, mtime), fields in zip(changed, headers):
+                self._delete(abfFilePath)
+                if fields is None:
+                    self._db.execute(sqlFailure, [abfFilePath, size, mtime])
+                    continue
+                values = [abfFilePath, size, mtime]
+                values += [fields[x] for x in CATALOG_FIELDS]
+                self._db.execute(sql, values)
+                writtenCount += 1
+
+            prefix = os.path.join(folder, "")
+            for abfFilePath in known:
+                if abfFilePath in found or not abfFilePath.startswith(prefix):
+                    continue
+                if recursive or os.path.dirname(abfFilePath) == folder:
+                    self._delete(abfFilePath)
+
+        log.debug("read %d of %d ABF headers in %s (%d failed)" %
+                  (len(paths), len(found), folder, len(paths) - writtenCount))
+        return writtenCount
+
+    def _delete(self, abfFilePath):
+        """Remove all records of the given file."""
+        for table in ["abfs", "failures"]:
+            self._db.execute("DELETE FROM %s WHERE path=?" % table,
+                             [abfFilePath])
+
+    def query(self, protocol=None, dateStart=None, dateEnd=None, **fields):
+        """
+        Return a list of dictionaries (one per ABF) with catalog information
+        of all ABFs matching the given protocol, recorded between dateStart
+        and dateEnd (datetime objects or ISO strings), and matching any
+        additional field given as a keyword argument (e.g., sweepCount=3).
+        """
+        conditions = []
+        values = []
+        if protocol is not None:
+            fields["protocol"] = protocol
+        for name, value in fields.items():
+            if not name in CATALOG_FIELDS:
+                raise ValueError("invalid catalog field: " + name)
+            conditions.append("%s=?" % name)
+            values.append(value)
+        if dateStart is not None:
+            conditions.append("abfDateTime>=?")
+            values.append(_dateString(dateStart))
+        if dateEnd is not None:
+            conditions.append("abfDateTime<=?")
+            values.append(_dateString(dateEnd))
+
+        sql = "SELECT * FROM abfs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY abfDateTime"
+
+        abfInfos = []
+        for row in self._db.execute(sql, values):
+            abfInfo = dict(row)
+            for name in CATALOG_LIST_FIELDS:
+                abfInfo[name] = json.loads(abfInfo[name])
+            abfInfo["abfDateTime"] = datetime.datetime.strptime(
+                abfInfo["abfDateTime"], CATALOG_DATETIME_FORMAT)
+            abfInfos.append(abfInfo)
+        return abfInfos
+
+    def protocols(self):
+        """Return a sorted list of all protocols in the catalog."""
+        sql = "SELECT DISTINCT protocol FROM abfs ORDER BY protocol"
+        return [row[0] for row in self._db.execute(sql)]
+
+
+def _readHeaders(abfFilePaths, processes=None):
+    """
+    Return a list of catalog fields (one per path) using a pool of processes.
+    Small jobs (or processes=1) are read in this process.
+    """
+    if processes == 1 or len(abfFilePaths) < 2:
+        return [readHeaderFields(x) for x in abfFilePaths]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    chunkSize = max(1, len(abfFilePaths) // (processes * 4))
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(readHeaderFields, abfFilePaths,
+                             chunksize=chunkSize))
+
+
+def _dateString(value):
+    """Return a datetime (or ISO string) in the catalog date format."""
+    if isinstance(value, datetime.datetime):
+        return value.strftime(CATALOG_DATETIME_FORMAT)
+    return str(value)
@@ -0,0 +1,123 @@
+"""
+Code here calculates MD5 hashes of ABF files (used by abf.md5 and
+abf.fileUUID). Files are hashed in fixed-size chunks so memory use does not
+grow with file size, and hashing can happen in a background thread.
+
+Hashes can optionally be stored in a SQLite database keyed by path, size, and
+modification time so unchanged files never need to be hashed again:
+
+    pyabf.fileHash.setCacheFile("abfHashes.db")
+"""
+
+import os
+import hashlib
+import sqlite3
+import threading
+import concurrent.futures
+import logging
+log = logging.getLogger(__name__)
+
+# bytes read from disk at a time while hashing
+HASH_CHUNK_BYTES = 1024 * 1024
+
+# the persistent hash cache (a HashCache) or None if hashes are not cached
+cache = None
+
+# threads used to hash files in the background
+_executor = None
+_executorLock = threading.Lock()
+
+
+class HashCache:
+    """
+    A SQLite database of MD5 hashes keyed by file path. A stored hash is only
+    used if the size and modification time of the file have not changed.
+    """
+
+    def __init__(self, databasePath):
+        self.databasePath = os.path.abspath(databasePath)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.databasePath,
+                                   check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS hashes ("
+                         "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+                         "md5 TEXT)")
+
+    def __repr__(self):
+        return 'HashCache(%s)' % (self.databasePath)
+
+    def get(self, filePath, stat):
+        """Return the stored MD5 of the file (or None if unknown or stale)."""
+        sql = "SELECT size, mtime, md5 FROM hashes WHERE path=?"
+        with self._lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(sql, [filePath]).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return row[2]
+        return None
+
+    def set(self, filePath, stat, md5):
+        """Store the MD5 of the file (ignored if the cache was closed)."""
+        sql = "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)"
+        with self._lock:
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute(sql, [filePath, stat.st_size,
+                                       stat.st_mtime, md5])
+
+    def close(self):
+        """Close the connection to the database."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def setCacheFile(databasePath):
+    """
+    Store hashes in (and read them from) the given SQLite database file.
+    Use None to stop caching hashes.
+    """
+    global cache
+    if cache:
+        cache.close()
+    cache = HashCache(databasePath) if databasePath else None
+
+
+def md5(filePath, chunkBytes=HASH_CHUNK_BYTES):
+    """
+    Return the MD5 hash (uppercase hex string) of the given file. The file is
+    read in chunks, and the hash cache is used if one has been set.
+    """
+    hashCache = cache  # setCacheFile() may replace it from another thread
+    filePath = os.path.abspath(filePath)
+    stat = os.stat(filePath)
+    if hashCache:
+        hashString = hashCache.get(filePath, stat)
+        if hashString:
+            return hashString
+
+    hasher = hashlib.md5()
+    with open(filePath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunkBytes), b''):
+            hasher.update(chunk)
+    hashString = hasher.hexdigest().upper()
+
+    if hashCache:
+        hashCache.set(filePath, stat, hashString)
+    return hashString
+
+
+def md5Background(filePath):
+    """
+    Start hashing the given file in a background thread and return a
+    concurrent.futures.Future whose result() is the MD5 hash.
+    """
+    global _executor
+    with _executorLock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                thread_name_prefix="pyabf-md5")
+    return _executor.submit(md5, filePath)
@@ -11,14 +11,108 @@ the data from that file so the file only needs to be read from disk once.
 import numpy as np
 import copy
 import os
+import time
+import collections
+import threading
 from pathlib import Path, PureWindowsPath
 import warnings
 import pyabf
 import pyabf.waveform
 
-# cache stimulus files in this dictionary
-# keys are stimulus filenames, values are ABF and ATF objects
-cachedStimuli = {}
+# limits of the stimulus waveform cache
+STIMULUS_CACHE_MAX_ENTRIES = 64
+STIMULUS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+class StimulusCache:
+    """
+    A thread-safe least-recently-used cache of stimulus waveforms (numpy
+    arrays) bounded by number of entries and by total bytes. Keys contain the
+    resolved path, modification time, and size of the stimulus file so a file
+    which changes on disk is read again. Hits, misses, and evictions are
+    counted.
+    """
+
+    def __init__(self, maxEntries=STIMULUS_CACHE_MAX_ENTRIES,
+                 maxBytes=STIMULUS_CACHE_MAX_BYTES):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self._waveforms = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "StimulusCache(%d entries, %d bytes, %d hits, %d misses)" % (
+            len(self), self.bytes, self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._waveforms)
+
+    def __contains__(self, key):
+        return key in self._waveforms
+
+    def get(self, key):
+        """Return a copy of the cached waveform (or None if not cached)."""
+        with self._lock:
+            if not key in self._waveforms:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._waveforms.move_to_end(key)
+            return self._waveforms[key].copy()
+
+    def set(self, key, waveform):
+        """Store a waveform, evicting the least recently used if needed."""
+        waveform = np.array(waveform)
+        with self._lock:
+            if key in self._waveforms:
+                self.bytes -= self._waveforms.pop(key).nbytes
+            if waveform.nbytes > self.maxBytes:
+                return
+            self._waveforms[key] = waveform
+            self.bytes += waveform.nbytes
+            while (len(self._waveforms) > self.maxEntries or
+                   self.bytes > self.maxBytes):
+                key, evicted = self._waveforms.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all waveforms and reset the counters."""
+        with self._lock:
+            self._waveforms.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return a dictionary describing the state of the cache."""
+        with self._lock:
+            return {"entries": len(self._waveforms), "bytes": self.bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+# cache stimulus waveforms read from stimulus files (ABF and ATF)
+cachedStimuli = StimulusCache()
+
+# resolved stimulus file paths (or None if not found) are remembered for this
+# many seconds so repeated lookups do not touch the filesystem
+STIMULUS_PATH_CACHE_SEC = 60
+
+# keys describe where to look, values are [resolved path, time resolved]
+cachedStimulusPaths = {}
+_cachedStimulusPathsLock = threading.Lock()
+
+
+def clearStimulusPathCache():
+    """Forget all resolved stimulus file paths."""
+    with _cachedStimulusPathsLock:
+        cachedStimulusPaths.clear()
 
 
 class Stimulus:
@@ -59,7 +153,7 @@ class Stimulus:
                            self.abf.holdingCommand[self.channel])
 
         elif nWaveformSource == 1:
-            epochTable = pyabf.waveform.EpochTable(self.abf, self.channel)
+            epochTable = self.abf._getEpochTable(self.channel)
             self.text = str(epochTable)
             sweepWaveform = epochTable.epochWaveformsBySweep[stimulusSweep]
             sweepC = sweepWaveform.getWaveform()
@@ -74,12 +168,91 @@ class Stimulus:
             return np.full(self.abf.sweepPointCount, np.nan)
 
 
+    def stimulusWaveformMatrix(self):
+        """
+        Return the command waveform of every sweep as a 2D array (one row per
+        sweep) generated in a single pass. Rows are written directly into the
+        array, and sweeps whose epochs are identical are only generated once.
+        """
+
+        abf = self.abf
+        shape = (abf.sweepCount, abf.sweepPointCount)
+
+        if abf.abfVersion["major"] == 1:
+            nWaveformEnable = abf._headerV1.nWaveformEnable[self.channel]
+            nWaveformSource = abf._headerV1.nWaveformSource[self.channel]
+        elif abf.abfVersion["major"] == 2:
+            nWaveformEnable = abf._dacSection.nWaveformEnable[self.channel]
+            nWaveformSource = abf._dacSection.nWaveformSource[self.channel]
+
+        if nWaveformEnable == 0 or nWaveformSource == 0:
+            return np.full(shape, abf.holdingCommand[self.channel])
+
+        elif nWaveformSource == 1:
+            epochTable = abf._getEpochTable(self.channel)
+            sweepCs = np.full(shape, np.nan)
+            sweepsByEpochs = {}
+            for sweep, sweepWaveform in enumerate(
+                    epochTable.epochWaveformsBySweep):
+                epochs = (tuple(sweepWaveform.p1s), tuple(sweepWaveform.p2s),
+                          tuple(sweepWaveform.levels),
+                          tuple(sweepWaveform.types),
+                          tuple(sweepWaveform.pulseWidths),
+                          tuple(sweepWaveform.pulsePeriods))
+                if epochs in sweepsByEpochs:
+                    sweepCs[sweep] = sweepCs[sweepsByEpochs[epochs]]
+                    continue
+                sweepsByEpochs[epochs] = sweep
+                if sweepWaveform.p2s[-1] <= shape[1]:
+                    sweepWaveform.getWaveform(out=sweepCs[sweep])
+                else:
+                    sweepCs[sweep] = sweepWaveform.getWaveform()[:shape[1]]
+            return sweepCs
+
+        elif nWaveformSource == 2:
+            sweepC = stimulusWaveformFromFile(abf)[:shape[1]]
+            sweepCs = np.full(shape, np.nan)
+            sweepCs[:, :len(sweepC)] = sweepC
+            return sweepCs
+
+        else:
+            return np.full(shape, np.nan)
+
+
 def findStimulusWaveformFile(abf, channel=0):
     """
     Look for the stimulus waveform file in several places. Return the path
     where it can be found. Return None if it cannot be found.
 
     The original path is an absolute windows filename stored in the ABF header.
+    Unless the ABF was opened with cacheStimulusFiles=False, results
+    (including failures) are remembered for STIMULUS_PATH_CACHE_SEC so ABFs
+    sharing a stimulus file only search the filesystem once. A remembered
+    path is only used if the file still exists.
+    """
+
+    if not abf._cacheStimulusFiles:
+        return _searchForStimulusWaveformFile(abf, channel)
+
+    key = (abf._stringsIndexed.lDACFilePath[channel], os.getcwd(),
+           str(abf.stimulusFileFolder), abf.abfFolderPath)
+    with _cachedStimulusPathsLock:
+        if key in cachedStimulusPaths:
+            stimPath, timeResolved = cachedStimulusPaths[key]
+            isFresh = time.monotonic() - timeResolved < STIMULUS_PATH_CACHE_SEC
+            if isFresh and (stimPath is None or os.path.exists(stimPath)):
+                return stimPath
+
+    stimPath = _searchForStimulusWaveformFile(abf, channel)
+    with _cachedStimulusPathsLock:
+        cachedStimulusPaths[key] = [stimPath, time.monotonic()]
+    return stimPath
+
+
+def _searchForStimulusWaveformFile(abf, channel=0):
+    """
+    Search the filesystem for the stimulus waveform file. Return the path
+    where it can be found. Return None (and warn) if it cannot be found.
     """
 
     # first try looking at the path stored in the header
@@ -132,14 +305,33 @@ def stimulusWaveformFromFile(abf, channel=0):
         return np.full(abf.sweepPointCount, np.nan)
 
     if abf._cacheStimulusFiles:
-        if not stimPath in cachedStimuli.keys():
-            if stimPath.upper().endswith(".ABF"):
-                cachedStimuli[stimPath] = pyabf.ABF(stimPath)
-            elif stimPath.upper().endswith(".ATF"):
-                cachedStimuli[stimPath] = pyabf.ATF(stimPath)
-        return cachedStimuli[stimPath].sweepY
+        return loadStimulusWaveform(stimPath, cachedStimuli)
+    else:
+        return loadStimulusWaveform(stimPath, None)
+
+
+def loadStimulusWaveform(stimPath, cache=cachedStimuli):
+    """
+    Return the waveform (first sweep) of a stimulus file (ABF or ATF). If a
+    StimulusCache is given the waveform is read from it (or stored in it), so
+    a stimulus file is only read from disk once unless it is modified.
+    """
+
+    if cache is not None:
+        stimPath = os.path.realpath(stimPath)
+        stat = os.stat(stimPath)
+        key = (stimPath, stat.st_mtime, stat.st_size)
+        waveform = cache.get(key)
+        if waveform is not None:
+            return waveform
+
+    if stimPath.upper().endswith(".ABF"):
+        waveform = pyabf.ABF(stimPath).sweepY
+    elif stimPath.upper().endswith(".ATF"):
+        waveform = pyabf.ATF(stimPath).sweepY
     else:
-        if stimPath.upper().endswith(".ABF"):
-            return pyabf.ABF(stimPath).sweepY
-        elif stimPath.upper().endswith(".ATF"):
-            return pyabf.ATF(stimPath).sweepY
+        raise ValueError("stimulus files must be ABF or ATF files")
+
+    if cache is not None:
+        cache.set(key, waveform)
+    return waveform
@@ -3,6 +3,7 @@ from pyabf.tools.memtest import Memtest
 import pyabf.tools.sweep
 import pyabf.tools.memtestMath
 import pyabf.tools.ap
+import pyabf.tools.measure
 
 import warnings
 warnings.warn("All pyabf.tools modules are experimental (APIs may change)")
\ No newline at end of file
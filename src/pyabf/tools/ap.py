@@ -14,17 +14,27 @@ import pyabf
 import numpy as np
 import pyabf
 
+import functools
+import concurrent.futures
 import logging
 logging.basicConfig(level=logging.WARNING)
 log = logging.getLogger(__name__)
 
 
-def _where_cross(data, threshold):
-    """return a list of Is where the data first crosses above threshold."""
-    Is = np.where(data > threshold)[0]
-    Is = np.concatenate(([0], Is))
-    Ds = Is[:-1]-Is[1:]+1
-    return Is[np.where(Ds)[0]+1]
+# fields of the structured array returned by ap_features() (one row per AP)
+AP_FEATURE_DTYPE = np.dtype([
+    ("sweep", np.int32),  # sweep number
+    ("point", np.int64),  # index of the peak depolarization velocity
+    ("timeSec", np.float64),  # time of the point (from the start of the sweep)
+    ("threshold", np.float64),  # mV where dV/dt crosses thresholdDvDt
+    ("peak", np.float64),  # mV at the top of the AP
+    ("amplitude", np.float64),  # mV from threshold to peak
+    ("halfWidthMs", np.float64),  # width at half amplitude
+    ("ahp", np.float64),  # mV at the bottom of the after-hyperpolarization
+    ("ahpDelayMs", np.float64),  # time from peak to the bottom of the AHP
+    ("riseRate", np.float64),  # maximum dV/dt (mV/ms)
+    ("fallRate", np.float64),  # minimum dV/dt (mV/ms) after the peak
+])
 
 
 def ap_points_currentSweep(abf, dVthresholdPos=15, betweenSec1=None, betweenSec2=None):
@@ -39,34 +49,75 @@ def ap_points_currentSweep(abf, dVthresholdPos=15, betweenSec1=None, betweenSec2
     # scale it to V/S (mV/ms)
     sweepDeriv = sweepDeriv * abf.dataRate / 1000
 
+    sweeps, points = _ap_points_from_derivative(
+        sweepDeriv[np.newaxis], abf.dataPointsPerMs, dVthresholdPos)
+    return [int(x) for x in points]
+
+
+def ap_points(abf, channel=0, dVthresholdPos=15):
+    """
+    Primitive AP detection performed on every sweep at once. Returns
+    [sweeps, points] (arrays with one element per AP) indicating the sweep
+    and index of the peak depolarization velocity of each AP.
+    """
+    assert isinstance(abf, pyabf.ABF)
+
+    # calculate first derivative of every sweep and scale it to V/S (mV/ms)
+    sweepDerivs = np.diff(abf.getSweepMatrix(channel), axis=1)
+    sweepDerivs *= abf.dataRate
+    sweepDerivs /= 1000
+
+    return _ap_points_from_derivative(sweepDerivs, abf.dataPointsPerMs,
+                                      dVthresholdPos)
+
+
+def _ap_points_from_derivative(sweepDerivs, pointsPerMs, dVthresholdPos):
+    """
+    Detect APs in a 2D array of sweep derivatives (mV/ms) without looping
+    over sweeps or crossings. Returns [sweeps, points] arrays.
+    """
+    sweepDerivs = np.asarray(sweepDerivs)
+    pointCount = sweepDerivs.shape[1]
+    windowSize = pointsPerMs*2
+
+    def windowValues(sweeps, points, fillValue):
+        """Return values of the window after each point (padded at ends)."""
+        window = points[:, np.newaxis] + np.arange(windowSize)
+        values = sweepDerivs[sweeps[:, np.newaxis],
+                             np.minimum(window, pointCount - 1)]
+        return np.where(window < pointCount, values, fillValue)
+
     # determine where crossings occur
-    crossings = _where_cross(sweepDeriv, dVthresholdPos)
+    above = sweepDerivs > dVthresholdPos
+    crossing = np.empty_like(above)
+    crossing[:, 0] = above[:, 0]
+    np.greater(above[:, 1:], above[:, :-1], out=crossing[:, 1:])
+    sweeps, points = np.divmod(np.flatnonzero(crossing), pointCount)
 
     # center APs on their positive dV peak and eliminate duplicates
-    for i, pt in enumerate(crossings):
-        derivFast = sweepDeriv[pt:pt+abf.dataPointsPerMs*2]
-        ptMax = np.max(derivFast)
-        crossings[i] = pt + np.where(derivFast == ptMax)[0][0]
-    crossings = sorted(list(set(crossings)))
+    if len(points):
+        derivFast = windowValues(sweeps, points, -np.inf)
+        points = points + np.argmax(derivFast, axis=1)
+    eventIDs = np.unique(sweeps * pointCount + points)
+    sweeps, points = eventIDs // pointCount, eventIDs % pointCount
 
-    # throw out crossings which don't go negative after 4ms
+    # throw out crossings which don't go negative after 2ms
     dVthresholdNeg = -dVthresholdPos/2
-    for i, pt in enumerate(crossings):
-        derivFast = sweepDeriv[pt:pt+abf.dataPointsPerMs*2]
-        if np.min(derivFast) > dVthresholdNeg:
-            crossings[i] = 0
-    crossings = [x for x in crossings if x]
+    if len(points):
+        derivFast = windowValues(sweeps, points, np.inf)
+        goesNegative = np.min(derivFast, axis=1) <= dVthresholdNeg
+        sweeps, points = sweeps[goesNegative], points[goesNegative]
 
-    # if there are doubles, throw-out the second one
-    for i in range(len(crossings)):
-        if i == 0:
-            continue
-        dPoints = crossings[i] - crossings[i-1]
-        if dPoints < abf.dataPointsPerMs*3:
-            crossings[i] = 0
-    crossings = [x for x in crossings if x]
-
-    return crossings
+    # if there are doubles, throw-out the second one (any AP closer than 3ms
+    # to the last AP kept in the same sweep)
+    isKept = np.ones(len(points), bool)
+    lastSweep, lastPoint = -1, 0
+    for i, (sweep, point) in enumerate(zip(sweeps.tolist(), points.tolist())):
+        if sweep == lastSweep and point - lastPoint < pointsPerMs*3:
+            isKept[i] = False
+        else:
+            lastSweep, lastPoint = sweep, point
+    return [sweeps[isKept], points[isKept]]
 
 
 def ap_freq_per_sweep(abf, singleEpoch=False):
@@ -81,16 +132,18 @@ def ap_freq_per_sweep(abf, singleEpoch=False):
     else:
         pt1, pt2 = 0, abf.sweepPointCount
 
-    apFreqInBin = [0]*abf.sweepCount
+    sweeps, apPoints = ap_points(abf)
+    inBin = (apPoints > pt1) & (apPoints < pt2)
+    sweeps, apPoints = sweeps[inBin], apPoints[inBin]
+
+    timeSpanSec = (pt2-pt1)/abf.dataRate
+    apCounts = np.bincount(sweeps, minlength=abf.sweepCount)
+    apFreqInBin = [x/timeSpanSec for x in apCounts]
     apFreqFirst = [0]*abf.sweepCount
-    for sweep in abf.sweepList:
-        abf.setSweep(sweep)
-        apPoints = ap_points_currentSweep(abf)
-        apPoints = [x for x in apPoints if x > pt1 and x < pt2]
-        timeSpanSec = (pt2-pt1)/abf.dataRate
-        apFreqInBin[sweep] = len(apPoints)/timeSpanSec
-        if len(apPoints) > 1:
-            apFreqFirst[sweep] = abf.dataRate/(apPoints[1]-apPoints[0])
+    firstAPs = np.searchsorted(sweeps, abf.sweepList)
+    for sweep in np.flatnonzero(apCounts > 1):
+        i = firstAPs[sweep]
+        apFreqFirst[sweep] = abf.dataRate/(apPoints[i+1]-apPoints[i])
     return [apFreqInBin, apFreqFirst]
 
 
@@ -107,3 +160,134 @@ def extract_first_ap(abf, paddingMsec=50):
                 i2 = len(abf.sweepY)-1
             return abf.sweepY[i1:i2]
     return None
+
+
+def ap_features(abf, channel=0, dVthresholdPos=15, thresholdDvDt=10,
+                preMs=2, postMs=10, peakMs=2):
+    """
+    Return a structured array (AP_FEATURE_DTYPE) with one row of features for
+    every AP in every sweep. APs are detected with ap_points(), then a window
+    (preMs before to postMs after each AP) of every AP is stacked into a 2D
+    array so features of all APs are measured at once.
+
+    The AP threshold is where dV/dt last rises above thresholdDvDt before the
+    AP, and the peak is the highest point within peakMs of the AP. The AHP is
+    the lowest point after the peak (before the window ends or the next AP).
+    Features which could not be measured in the window are NaN.
+    """
+    assert isinstance(abf, pyabf.ABF)
+    sweepMatrix = abf.getSweepMatrix(channel)
+    sweeps, points = ap_points(abf, channel, dVthresholdPos)
+    features = np.zeros(len(points), AP_FEATURE_DTYPE)
+    features["sweep"] = sweeps
+    features["point"] = points
+    features["timeSec"] = points / abf.dataRate
+    if len(points) == 0:
+        return features
+
+    # stack a window of every AP (windows are shifted to stay in the sweep)
+    pointCount = sweepMatrix.shape[1]
+    windowSize = min(int((preMs + postMs) * abf.dataPointsPerMs), pointCount)
+    starts = np.clip(points - int(preMs * abf.dataPointsPerMs), 0,
+                     pointCount - windowSize)
+    windowCols = starts[:, np.newaxis] + np.arange(windowSize)
+    apWindows = sweepMatrix[sweeps[:, np.newaxis], windowCols]
+    apWindows = apWindows.astype(np.float64)
+    apDerivs = np.diff(apWindows, axis=1) * abf.dataRate / 1000
+
+    # columns of each AP (and the next AP in the same sweep) in its window
+    rows = np.arange(len(points))
+    cols = np.arange(windowSize)[np.newaxis]
+    apCols = (points - starts)[:, np.newaxis]
+    nextPoints = np.full(len(points), np.iinfo(np.int64).max // 2)
+    sameSweep = sweeps[1:] == sweeps[:-1]
+    nextPoints[:-1][sameSweep] = points[1:][sameSweep]
+    endCols = np.minimum(nextPoints - starts, windowSize)[:, np.newaxis]
+
+    # threshold is after the last sub-threshold dV/dt before the AP
+    isBelow = (cols[:, :-1] < apCols) & (apDerivs < thresholdDvDt)
+    hasThreshold = isBelow.any(axis=1)
+    thresholdCols = np.where(hasThreshold,
+                             windowSize - 1 - np.argmax(isBelow[:, ::-1], 1),
+                             0)
+    threshold = np.where(hasThreshold, apWindows[rows, thresholdCols], np.nan)
+
+    # peak is the highest point shortly after the AP
+    peakEndCols = np.minimum(apCols + int(peakMs * abf.dataPointsPerMs),
+                             endCols)
+    inPeak = (cols >= apCols) & (cols < peakEndCols)
+    peakCols = np.argmax(np.where(inPeak, apWindows, -np.inf), axis=1)
+    peak = apWindows[rows, peakCols]
+    amplitude = peak - threshold
+
+    # half-width is between interpolated half-amplitude crossings
+    halfAmplitude = (threshold + amplitude / 2)[:, np.newaxis]
+    isBelowHalf = apWindows < halfAmplitude
+    rising = isBelowHalf & (cols < peakCols[:, np.newaxis])
+    riseCols = windowSize - 1 - np.argmax(rising[:, ::-1], axis=1)
+    falling = isBelowHalf & (cols > peakCols[:, np.newaxis]) & (cols < endCols)
+    fallCols = np.argmax(falling, axis=1)
+    hasHalfWidth = rising.any(axis=1) & falling.any(axis=1)
+    riseCols = np.where(hasHalfWidth, riseCols, 0)
+    fallCols = np.where(hasHalfWidth, fallCols, 1)
+    riseFractions = _crossingFraction(apWindows[rows, riseCols],
+                                      apWindows[rows, riseCols + 1],
+                                      halfAmplitude[:, 0])
+    fallFractions = _crossingFraction(apWindows[rows, fallCols - 1],
+                                      apWindows[rows, fallCols],
+                                      halfAmplitude[:, 0])
+    halfWidthPoints = (fallCols - 1 + fallFractions) - \
+        (riseCols + riseFractions)
+    halfWidthMs = np.where(hasHalfWidth, halfWidthPoints, np.nan)
+    halfWidthMs /= abf.dataPointsPerMs
+
+    # AHP is the lowest point after the peak (before the next AP)
+    inAHP = (cols > peakCols[:, np.newaxis]) & (cols < endCols)
+    hasAHP = inAHP.any(axis=1)
+    ahpCols = np.argmin(np.where(inAHP, apWindows, np.inf), axis=1)
+    ahp = np.where(hasAHP, apWindows[rows, ahpCols], np.nan)
+    ahpDelayMs = np.where(hasAHP, ahpCols - peakCols, np.nan)
+    ahpDelayMs /= abf.dataPointsPerMs
+
+    # rates of rise (at the AP) and fall (after the peak)
+    inFall = (cols[:, :-1] >= peakCols[:, np.newaxis]) & \
+        (cols[:, :-1] < endCols - 1)
+    fallRate = np.min(np.where(inFall, apDerivs, np.inf), axis=1)
+
+    features["threshold"] = threshold
+    features["peak"] = peak
+    features["amplitude"] = amplitude
+    features["halfWidthMs"] = halfWidthMs
+    features["ahp"] = ahp
+    features["ahpDelayMs"] = ahpDelayMs
+    features["riseRate"] = apDerivs[rows, np.minimum(apCols[:, 0],
+                                                     windowSize - 2)]
+    features["fallRate"] = np.where(np.isfinite(fallRate), fallRate, np.nan)
+    return features
+
+
+def ap_features_files(abfFilePaths, processes=None, **kwargs):
+    """
+    Return a list of AP feature arrays (see ap_features) for a list of ABF
+    files. Files are analyzed in a pool of processes (one per CPU unless
+    processes is given). Keyword arguments are passed to ap_features().
+    """
+    analyze = functools.partial(_ap_features_file, **kwargs)
+    if processes == 1 or len(abfFilePaths) < 2:
+        return [analyze(x) for x in abfFilePaths]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(analyze, abfFilePaths))
+
+
+def _ap_features_file(abfFilePath, **kwargs):
+    """Return AP features of an ABF file (used by worker processes)."""
+    return ap_features(pyabf.ABF(abfFilePath), **kwargs)
+
+
+def _crossingFraction(value1, value2, crossValue):
+    """Return where (0-1) crossValue falls between value1 and value2."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (crossValue - value1) / (value2 - value1)
+    return np.where(np.isfinite(fraction), fraction, 0)
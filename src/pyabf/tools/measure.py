@@ -0,0 +1,149 @@
+"""
+Code here measures the same region (an epoch or a time window) of every sweep
+at once, similar to statistics measured with cursors in ClampFit.
+
+Sweep data is treated as one flat array and each sweep's region is reduced as
+a segment (with np.add.reduceat and related functions), so regions may have a
+different length in every sweep (as epochs with a duration delta do).
+
+Example:
+    measurements = pyabf.tools.measure.measureEpoch(abf, "B")
+    print(measurements["mean"].values)  # mean of epoch B of every sweep
+"""
+
+import numpy as np
+import pyabf
+from pyabf.tools.sweep import SweepMeasurement
+
+MEASUREMENTS = ["mean", "min", "max", "area", "slope"]
+
+
+def epochPoints(abf, epoch, channel=0):
+    """
+    Return [p1s, p2s] (arrays with one value per sweep) indicating the first
+    point and the point after the last point of an epoch in every sweep.
+    The epoch can be a letter ("B") or an index (1).
+    """
+    assert isinstance(abf, pyabf.ABF)
+    epochTable = abf._getEpochTable(channel)
+    if isinstance(epoch, str):
+        epochLetters = [x.epochLetter for x in epochTable.epochs]
+        if not epoch.upper() in epochLetters:
+            raise ValueError("Epoch %s not available (must be one of: %s)" % (
+                epoch, ", ".join(epochLetters)))
+        epochIndex = epochLetters.index(epoch.upper())
+    else:
+        epochNumbers = [x.epochNumber for x in epochTable.epochs]
+        if not epoch in epochNumbers:
+            raise ValueError("Epoch %d not available" % (epoch))
+        epochIndex = epochNumbers.index(epoch)
+
+    # the first epoch of each sweep waveform is the pre-epoch period
+    p1s = [x.p1s[epochIndex+1] for x in epochTable.epochWaveformsBySweep]
+    p2s = [x.p2s[epochIndex+1] for x in epochTable.epochWaveformsBySweep]
+    return [np.array(p1s), np.array(p2s)]
+
+
+def measureEpoch(abf, epoch, channel=0, measurements=MEASUREMENTS):
+    """
+    Measure an epoch (letter or index) of every sweep. Returns a dictionary
+    of SweepMeasurement objects (one per measurement) with one value per sweep.
+    """
+    p1s, p2s = epochPoints(abf, epoch, channel)
+    return measureSegments(abf, p1s, p2s, channel, measurements)
+
+
+def measureRange(abf, timeSec1, timeSec2, channel=0,
+                 measurements=MEASUREMENTS):
+    """
+    Measure a time range (seconds from the start of each sweep) of every
+    sweep. Returns a dictionary of SweepMeasurement objects (one per
+    measurement) with one value per sweep.
+    """
+    p1 = int(timeSec1*abf.dataRate)
+    p2 = int(timeSec2*abf.dataRate)
+    p1s = np.full(abf.sweepCount, p1)
+    p2s = np.full(abf.sweepCount, p2)
+    return measureSegments(abf, p1s, p2s, channel, measurements)
+
+
+def measureSegments(abf, p1s, p2s, channel=0, measurements=MEASUREMENTS):
+    """
+    Measure the region between p1s[i] and p2s[i] of every sweep i. Returns a
+    dictionary of SweepMeasurement objects (one per measurement) with one
+    value per sweep. Sweeps whose region is empty are measured as NaN.
+
+    Available measurements are mean, min, max, area (the integral of the
+    signal in units*sec), and slope (of a linear fit in units/sec).
+    """
+    assert isinstance(abf, pyabf.ABF)
+    for measurement in measurements:
+        if not measurement in MEASUREMENTS:
+            raise ValueError("unknown measurement: %s" % measurement)
+
+    # treat all sweeps as a flat array and find each segment in it
+    sweeps = abf.getSweepMatrix(channel)
+    flat = sweeps.reshape(-1)
+    sweepPointCount = sweeps.shape[1]
+    p1s = np.clip(p1s, 0, sweepPointCount)
+    p2s = np.clip(p2s, p1s, sweepPointCount)
+    offsets = np.arange(len(p1s)) * sweepPointCount
+    starts = offsets + p1s
+    ends = offsets + p2s
+    counts = p2s - p1s
+    valid = counts > 0
+
+    # reduce segments [start, end) using interleaved reduceat indices
+    indices = np.ravel(np.column_stack([starts, ends]))
+    indices = np.clip(indices, 0, len(flat) - 1)
+    if len(flat) and ends[-1] >= len(flat):
+        indices = indices[:-1]  # the last segment reduces to the end
+
+    def reduce(ufunc, values, dtype=None):
+        reduced = ufunc.reduceat(values, indices, dtype=dtype)[::2]
+        reduced = reduced.astype(np.float64)
+        reduced[~valid] = np.nan
+        return reduced
+
+    units = abf.adcUnits[channel]
+    results = {}
+    sums = reduce(np.add, flat, np.float64)
+    if "mean" in measurements:
+        results["mean"] = _sweepMeasurement(
+            sums / np.maximum(counts, 1), "mean", "mean", units)
+    if "min" in measurements:
+        results["min"] = _sweepMeasurement(
+            reduce(np.minimum, flat), "minimum", "min", units)
+    if "max" in measurements:
+        results["max"] = _sweepMeasurement(
+            reduce(np.maximum, flat), "maximum", "max", units)
+    if "area" in measurements:
+        results["area"] = _sweepMeasurement(
+            sums / abf.dataRate, "area", "area", units + "*s")
+    if "slope" in measurements:
+        # least squares slope using point numbers relative to each segment
+        segmentStarts = np.cumsum(counts) - counts
+        relative = np.arange(np.sum(counts))
+        relative -= np.repeat(segmentStarts, counts)
+        segmentValues = flat[np.repeat(starts, counts) + relative]
+        sumsXY = np.zeros(len(counts))
+        if len(relative):
+            sumsXY[valid] = np.add.reduceat(relative * segmentValues,
+                                            segmentStarts[valid])
+        n = counts.astype(np.float64)
+        sumsX = n * (n - 1) / 2
+        sumsXX = (n - 1) * n * (2 * n - 1) / 6
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = (n * sumsXY - sumsX * sums) / (n * sumsXX - sumsX**2)
+        slopes[n < 2] = np.nan
+        results["slope"] = _sweepMeasurement(
+            slopes * abf.dataRate, "slope", "slope", units + "/s")
+
+    return results
+
+
+def _sweepMeasurement(values, name, abbreviation, units):
+    """Return a SweepMeasurement holding the given values."""
+    measurement = SweepMeasurement(len(values), name, abbreviation, units)
+    measurement.values = values
+    return measurement
@@ -28,19 +28,37 @@ class Memtest:
         self.CmStep = Result(abf.sweepCount, "Capacitance (Step)", "Cm", "pF")
         self.CmRamp = Result(abf.sweepCount, "Capacitance (Ramp)", "Cm", "pF")
 
+        # measure all sweeps at once if memtest epochs are in the same place
+        stepResults = pyabf.tools.memtestMath.sweepsStep(abf, channel)
+        if stepResults is not None:
+            Ih, Rm, Ra, CmStep = stepResults
+            self.Ih.values[:] = Ih
+            self.Rm.values[:] = Rm
+            self.Ra.values[:] = Ra
+            self.CmStep.values[:] = CmStep
+        CmRamps = pyabf.tools.memtestMath.sweepsRamp(abf, channel)
+        if CmRamps is not None:
+            self.CmRamp.values[:] = CmRamps
+        if stepResults is not None and CmRamps is not None:
+            return
+
+        # otherwise measure sweep by sweep
         for sweepNumber in abf.sweepList:
             abf.setSweep(sweepNumber, channel)
 
             # square step memtest
-            Ih, Rm, Ra, CmStep = pyabf.tools.memtestMath.currentSweepStep(abf)
-            self.Ih.values[sweepNumber] = Ih
-            self.Rm.values[sweepNumber] = Rm
-            self.Ra.values[sweepNumber] = Ra
-            self.CmStep.values[sweepNumber] = CmStep
+            if stepResults is None:
+                Ih, Rm, Ra, CmStep = \
+                    pyabf.tools.memtestMath.currentSweepStep(abf)
+                self.Ih.values[sweepNumber] = Ih
+                self.Rm.values[sweepNumber] = Rm
+                self.Ra.values[sweepNumber] = Ra
+                self.CmStep.values[sweepNumber] = CmStep
 
             # ramp memtest
-            CmRamp = pyabf.tools.memtestMath.currentSweepRamp(abf)
-            self.CmRamp.values[sweepNumber] = CmRamp
+            if CmRamps is None:
+                CmRamp = pyabf.tools.memtestMath.currentSweepRamp(abf)
+                self.CmRamp.values[sweepNumber] = CmRamp
 
     @property
     def summary(self):
@@ -5,6 +5,9 @@ https://github.com/swharden/pyABF/blob/master/docs/advanced/v1%20cookbook/memtes
 import pyabf
 import numpy as np
 
+import logging
+log = logging.getLogger(__name__)
+
 #############################################################################
 #############################################################################
 # The code below is very messy. It was hacked on a lot.
@@ -26,27 +29,35 @@ def _cm_ramp_points_and_voltages(abf):
     if abf.sweepUnitsY != "pA":
         raise Exception("must be in voltage clamp configuration")
 
-    for i, p1 in enumerate(abf.sweepEpochs.p1s):
+    return _cm_ramp_epoch_points_and_voltages(abf.sweepEpochs)
+
+
+def _cm_ramp_epoch_points_and_voltages(sweepEpochs):
+    """
+    Return [points, voltages] of the first memtest ramp in the given sweep
+    epochs (an EpochSweepWaveform) or None if there is no ramp.
+    """
+    for i, p1 in enumerate(sweepEpochs.p1s):
         if i == 0:
             continue
 
         # ensure this sweep and the last are both ramps
-        if abf.sweepEpochs.types[i] != "Ramp":
+        if sweepEpochs.types[i] != "Ramp":
             continue
-        if abf.sweepEpochs.types[i-1] != "Ramp":
+        if sweepEpochs.types[i-1] != "Ramp":
             continue
 
         # ensure the levels are different
-        if abf.sweepEpochs.levels[i] == abf.sweepEpochs.levels[i-1]:
+        if sweepEpochs.levels[i] == sweepEpochs.levels[i-1]:
             continue
 
-        ptStart = abf.sweepEpochs.p1s[i-1]
-        ptTransition = abf.sweepEpochs.p1s[i]
-        ptEnd = abf.sweepEpochs.p2s[i]
+        ptStart = sweepEpochs.p1s[i-1]
+        ptTransition = sweepEpochs.p1s[i]
+        ptEnd = sweepEpochs.p2s[i]
         points = [ptStart, ptTransition, ptEnd]
 
-        voltageBefore = abf.sweepEpochs.levels[i-1]
-        voltageDuring = abf.sweepEpochs.levels[i]
+        voltageBefore = sweepEpochs.levels[i-1]
+        voltageDuring = sweepEpochs.levels[i]
         voltages = [voltageBefore, voltageDuring]
 
         return [points, voltages]
@@ -82,7 +93,7 @@ def _cm_ramp_calculate(rampData, sampleRate, deltaVoltage, centerFrac=.3):
     capacitance of the cell. Data units must be in pA, sampleRate in points/sec,
     and voltage in mV. Positive (upward) or negative (V-shaped) ramps are okay.
     centerFrac is the fractional time span to draw data from in the center of
-    each ramp.
+    each ramp. If rampData is 2D (one ramp per row) one Cm is returned per row.
     """
 
     # ensure our values are of the correct types
@@ -91,20 +102,20 @@ def _cm_ramp_calculate(rampData, sampleRate, deltaVoltage, centerFrac=.3):
     deltaVoltage = float(deltaVoltage)
 
     # isolate and rearrange the downward vs upward slopes
-    trace1 = rampData[:int(len(rampData)/2)][::-1]
-    trace2 = rampData[int(len(rampData)/2):]
-    traceAvg = np.average((trace1, trace2), axis=0)
-    if not len(trace1) == len(trace2):
+    rampLength = rampData.shape[-1]
+    trace1 = rampData[..., :int(rampLength/2)][..., ::-1]
+    trace2 = rampData[..., int(rampLength/2):]
+    if not trace1.shape[-1] == trace2.shape[-1]:
         log.critical("rampData length must be an even multiple of 2")
         return
 
     # figure out the middle of the data we wish to sample from
-    centerPoint = int(len(trace1))/2
-    centerLeft = int(centerPoint-len(trace1)*centerFrac/2)
-    centerRight = int(centerPoint+len(trace1)*centerFrac/2)
+    centerPoint = int(trace1.shape[-1])/2
+    centerLeft = int(centerPoint-trace1.shape[-1]*centerFrac/2)
+    centerRight = int(centerPoint+trace1.shape[-1]*centerFrac/2)
 
     # determine the slope of the ramp (mV/ms)
-    rampSlideTimeMs = (len(rampData)/2)/sampleRate*1000
+    rampSlideTimeMs = (rampLength/2)/sampleRate*1000
     slope = deltaVoltage/rampSlideTimeMs
 
     # determine the average slope deviation (distance from the mean)
@@ -112,8 +123,8 @@ def _cm_ramp_calculate(rampData, sampleRate, deltaVoltage, centerFrac=.3):
     traceDeviation = traceDiff/2
 
     # calculate the deviation just for the center
-    deviationCenter = traceDeviation[centerLeft:centerRight]
-    deviation = np.mean(deviationCenter)
+    deviationCenter = traceDeviation[..., centerLeft:centerRight]
+    deviation = np.mean(deviationCenter, axis=-1)
 
     # capacitance is isolated capacitive transient divided by the command slope
     cm = deviation/slope
@@ -150,6 +161,63 @@ def _tauMonoExpFit(data, rateHz=20000, tau=.1, step=.1):
     return tau
 
 
+def monoExpFit(traces, rateHz=20000, lengths=None):
+    """
+    Fit an exponential decay to every row of a 2D array of traces which decay
+    to zero (all rows are fitted at once). Only the first lengths[i] points of
+    row i are fitted (default: all of them). Returns [taus, I0s, residuals]
+    arrays (tau in seconds, I0 at the first point, and the RMS error of the
+    fit). Rows without any points are NaN.
+
+    Like _tauMonoExpFit() the curve starts at the first point of the trace
+    and tau is chosen so the area under the curve matches the area under the
+    trace. The area of a sampled exponential is a geometric series, so tau is
+    solved for every row at once without evaluating exponentials of traces.
+    Rows whose area no decay can match (e.g., noise which does not decay) are
+    fitted one at a time with _tauMonoExpFit().
+    """
+    traces = np.atleast_2d(np.asarray(traces, dtype=np.float64))
+    pointCount = traces.shape[1]
+    if lengths is None:
+        lengths = np.full(len(traces), pointCount)
+    lengths = np.asarray(lengths)
+    inFit = np.arange(pointCount) < lengths[:, np.newaxis]
+
+    # area of each trace (normalized to its first point)
+    I0s = traces[:, 0].copy() if pointCount else np.full(len(traces), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        areas = np.sum(np.where(inFit, traces, 0), axis=1) / I0s
+    isValid = (lengths > 1) & (I0s > 0) & (areas < lengths)
+
+    # solve (1-r^n)/(1-r) = area for the ratio (r) between adjacent points
+    low = np.zeros(len(traces))
+    high = np.ones(len(traces))
+    for i in range(60):
+        ratios = (low + high) / 2
+        with np.errstate(invalid='ignore'):  # ratio reaches 1 for noise
+            seriesAreas = (1 - ratios**lengths) / (1 - ratios)
+        isLow = seriesAreas < areas
+        low = np.where(isLow, ratios, low)
+        high = np.where(isLow, high, ratios)
+    ratios = (low + high) / 2
+    with np.errstate(divide='ignore'):
+        taus = np.maximum(-1 / (np.log(ratios) * rateHz), 0.000001)
+    for row in np.flatnonzero(~isValid & (lengths > 0)):
+        taus[row] = _tauMonoExpFit(traces[row, :lengths[row]], rateHz)
+
+    # RMS residual of each fit
+    Xs = np.arange(pointCount) / rateHz
+    fitted = I0s[:, np.newaxis] * np.exp(-Xs / taus[:, np.newaxis])
+    errors = np.where(inFit, traces - fitted, 0)
+    residuals = np.sqrt(np.sum(errors**2, axis=1) / np.maximum(lengths, 1))
+
+    isEmpty = lengths < 1
+    taus[isEmpty] = np.nan
+    I0s[isEmpty] = np.nan
+    residuals[isEmpty] = np.nan
+    return [taus, I0s, residuals]
+
+
 def currentSweepStep(abf):
     """
     Returns [Ih, Rm, Ra, Cm] from a step protocol of the current sweep.
@@ -184,67 +252,151 @@ def _step_calculate(abf, trace, traceStepPoint, dV=-10, stepAvgLastFrac=.2,
     to calculate resting current.
     dV - step voltage change (mV)
     """
+    results = _steps_calculate(abf, [trace], traceStepPoint, dV,
+                               stepAvgLastFrac, fitToFracUpper)
+    return [x[0] for x in results]
+
+
+def _steps_calculate(abf, traces, traceStepPoint, dV=-10, stepAvgLastFrac=.2,
+                     fitToFracUpper=.9):
+    """
+    Like _step_calculate() but for a 2D array of traces (one per row) which
+    all step at traceStepPoint. Returns [Ih, Rm, Ra, Cm] arrays (one value per
+    row). Rows whose transient could not be isolated are NaN.
+    """
     assert isinstance(abf, pyabf.ABF)
 
-    trace1 = trace[:traceStepPoint]
-    trace2 = trace[traceStepPoint:]
+    traces = np.array(traces, dtype=np.float64, ndmin=2)
+    memTestFailResult = [np.full(len(traces), np.nan) for i in range(4)]
+    trace1 = traces[:, :traceStepPoint]
+    trace2 = traces[:, traceStepPoint:]
+    if trace1.shape[1] == 0 or trace2.shape[1] == 0:
+        return memTestFailResult
 
     # calculate the holding current (assume we are starting there)
-    Ih = np.mean(trace1)
+    Ih = np.mean(trace1, axis=1)
 
     # calculate the resting current at the end of the step
-    stepAvgLastPoint = int(len(trace2) - len(trace2)*stepAvgLastFrac)
-    Istep = np.mean(trace2[stepAvgLastPoint:])
-    Idelta = abs(Ih - Istep)
+    stepAvgLastPoint = int(trace2.shape[1] - trace2.shape[1]*stepAvgLastFrac)
+    Istep = np.mean(trace2[:, stepAvgLastPoint:], axis=1)
+    Idelta = np.abs(Ih - Istep)
 
     # V=I*R, R=V/I, R=dV/dI
-    Rm = (abs(dV)*(1e-3)) / (Idelta*(1e-12))*(1e-6)
+    with np.errstate(divide='ignore'):
+        Rm = (abs(dV)*(1e-3)) / (Idelta*(1e-12))*(1e-6)
 
     # To prepare for curve fitting, make negative steps look positive.
     if (dV < 0):
-        trace2 *= -1
-        Istep *= -1
+        trace2 = -trace2
+        Istep = -Istep
 
     # To prepare for curve fitting, isolate just the fast transient
-    trace2 = trace2[:abf.dataPointsPerMs*50]
+    trace2 = trace2[:, :abf.dataPointsPerMs*50]
 
-    # Start the trace at the peak
-    tracePeak = np.max(trace2)
-    tracePeakPos = np.where(trace2 == tracePeak)[0][0]
-    trace2 = trace2[tracePeakPos:]
+    # Start the traces at their peaks and subtract so they terminate at zero
+    peakIs = np.argmax(trace2, axis=1)
+    transients = _shift_rows(trace2, peakIs) - Istep[:, np.newaxis]
+    lengths = trace2.shape[1] - peakIs
+    cols = np.arange(trace2.shape[1])
 
-    # Subtract the trace so it terminates at zero
-    trace2 -= Istep
+    # cut off the traces where they hit zero
+    isZero = (transients <= 0) & (cols < lengths[:, np.newaxis])
+    lengths = np.where(isZero.any(axis=1), np.argmax(isZero, axis=1), lengths)
 
-    # cut off the trace where it hits zero
-    zeroI = np.where(trace2 <= 0)[0]
-    if len(zeroI):
-        zeroI = zeroI[0]
-        trace2 = trace2[:zeroI]
+    # Start the traces at certain fractions of their height
+    upperFracVals = fitToFracUpper*transients[:, 0]
+    isBelowUpper = (transients < upperFracVals[:, np.newaxis]) & \
+        (cols < lengths[:, np.newaxis])
+    upperIs = np.argmax(isBelowUpper, axis=1)
+    fitThis = _shift_rows(transients, upperIs)
 
-    # Start and end the trace at certain fractions of its height
-    upperFracVal = fitToFracUpper*trace2[0]
-    upperI = np.where(trace2 < upperFracVal)[0][0]
-    fitThis = trace2[upperI:]
-    fitThisXs = np.arange(len(fitThis))
+    # do an exponential curve fit of every trace
+    taus, I0s, residuals = monoExpFit(fitThis, abf.dataRate, lengths - upperIs)
 
-    # do a curve fit with successive approximation
-    tau = _tauMonoExpFit(fitThis, abf.dataRate)
-    tauMs = tau*1000
-
-    # regenerate fitted curve, allowing it to go negative
-    fittedXs = np.arange(len(fitThis)+upperI)-upperI
-    fitted = np.exp((-fittedXs/abf.dataRate)/tau)*fitThis[0]
-    I0 = fitted[0]
+    # regenerate fitted curves back to the peak, allowing them to go negative
+    I0 = I0s*np.exp(upperIs/abf.dataRate/taus)
 
     # Calculated Ra using I0 from the curve-fitted peak (Ra = dV/I0)
     Ra = ((dV*(1e-3)) / (I0*(1e-12)))*(1e-6)
-    Ra = abs(Ra)
+    Ra = np.abs(Ra)
 
     # Calculate capactance using our curve-fitted tau
-    Cm = (tau/(Ra*(1e6)))*(1e12)
+    Cm = (taus/(Ra*(1e6)))*(1e12)
+
+    results = [Ih, Rm, Ra, Cm]
+    isolated = isBelowUpper.any(axis=1)
+    for values, failValues in zip(results, memTestFailResult):
+        values[~isolated] = failValues[~isolated]
+    return results
+
+
+def _shift_rows(data, offsets):
+    """
+    Return a copy of a 2D array with each row shifted left by its offset.
+    Values shifted in at the end of each row are the last value of the row.
+    """
+    cols = offsets[:, np.newaxis] + np.arange(data.shape[1])
+    cols = np.minimum(cols, data.shape[1] - 1)
+    return data[np.arange(len(data))[:, np.newaxis], cols]
+
+
+def sweepsStep(abf, channel=0):
+    """
+    Returns [Ih, Rm, Ra, Cm] arrays (one value per sweep) from a step protocol
+    calculated for all sweeps at once. Returns None if the step is not at the
+    same points (with the same voltages) in every sweep.
+    """
+    stepInfo = _same_memtest_epochs(abf, channel,
+                                    _step_epoch_points_and_voltages)
+    if stepInfo is False:
+        return None
+    if stepInfo is None:
+        return [np.full(abf.sweepCount, np.nan) for i in range(4)]
+    stepPoints, stepVoltages = stepInfo
+    traces = abf.getSweepMatrix(channel)[:, stepPoints[0]:stepPoints[2]]
+    traceStepPoint = stepPoints[1]-stepPoints[0]
+    dV = stepVoltages[1]-stepVoltages[0]
+    return _steps_calculate(abf, traces, traceStepPoint, dV=dV)
+
+
+def sweepsRamp(abf, channel=0):
+    """
+    Returns an array of capacitance from a voltage clamp ramp (one value per
+    sweep) calculated for all sweeps at once. Returns None if the ramp is not
+    at the same points (with the same voltages) in every sweep.
+    """
+    cmInfo = _same_memtest_epochs(abf, channel,
+                                  _cm_ramp_epoch_points_and_voltages)
+    if cmInfo is False:
+        return None
+    if cmInfo is None:
+        return np.full(abf.sweepCount, np.nan)
+    rampPoints, rampVoltages = cmInfo
+    deltaVoltage = rampVoltages[1]-rampVoltages[0]
+    rampData = abf.getSweepMatrix(channel)[:, rampPoints[0]:rampPoints[2]]
+    return _cm_ramp_calculate(rampData, abf.dataRate, deltaVoltage)
 
-    return [Ih, Rm, Ra, Cm]
+
+def _same_memtest_epochs(abf, channel, epochPointsAndVoltages):
+    """
+    Return the [points, voltages] found by epochPointsAndVoltages() if they
+    are the same in every sweep (None if no sweep has a memtest epoch), or
+    False if they vary from sweep to sweep.
+    """
+    assert isinstance(abf, pyabf.ABF)
+
+    if abf.adcUnits[channel] != "pA":
+        raise Exception("must be in voltage clamp configuration")
+
+    epochTable = abf._getEpochTable(channel)
+    if len(epochTable.epochWaveformsBySweep) != abf.sweepCount:
+        return False
+    epochInfos = [epochPointsAndVoltages(x)
+                  for x in epochTable.epochWaveformsBySweep]
+    for epochInfo in epochInfos[1:]:
+        if epochInfo != epochInfos[0]:
+            return False
+    return epochInfos[0]
 
 
 def _step_points_and_voltages(abf):
@@ -262,21 +414,29 @@ def _step_points_and_voltages(abf):
     if abf.sweepUnitsY != "pA":
         raise Exception("must be in voltage clamp configuration")
 
-    for i, p1 in enumerate(abf.sweepEpochs.p1s):
+    return _step_epoch_points_and_voltages(abf.sweepEpochs)
+
+
+def _step_epoch_points_and_voltages(sweepEpochs):
+    """
+    Return [stepPoints, stepVoltages] of the first memtest step in the given
+    sweep epochs (an EpochSweepWaveform) or None if there is no step.
+    """
+    for i, p1 in enumerate(sweepEpochs.p1s):
         if i == 0:
             continue
-        if abf.sweepEpochs.types[i] != "Step":
+        if sweepEpochs.types[i] != "Step":
             continue
-        if abf.sweepEpochs.levels[i] == abf.sweepEpochs.levels[i-1]:
+        if sweepEpochs.levels[i] == sweepEpochs.levels[i-1]:
             continue
 
-        ptStart = abf.sweepEpochs.p1s[i-1]
-        ptTransition = abf.sweepEpochs.p1s[i]
-        ptEnd = abf.sweepEpochs.p2s[i]
+        ptStart = sweepEpochs.p1s[i-1]
+        ptTransition = sweepEpochs.p1s[i]
+        ptEnd = sweepEpochs.p2s[i]
         stepPoints = [ptStart, ptTransition, ptEnd]
 
-        voltageBeforeStep = abf.sweepEpochs.levels[i-1]
-        voltageDuringStep = abf.sweepEpochs.levels[i]
+        voltageBeforeStep = sweepEpochs.levels[i-1]
+        voltageDuringStep = sweepEpochs.levels[i]
         stepVoltages = [voltageBeforeStep, voltageDuringStep]
 
         return [stepPoints, stepVoltages]
@@ -151,8 +151,34 @@ class EpochSweepWaveform:
             sweepD[self.p1s[i]:self.p2s[i]] = digitalStateForChannel
         return sweepD
 
-    def getWaveform(self):
-        sweepC = np.full(self.p2s[-1], np.nan)
+    def getDigitalWaveformPacked(self, out=None):
+        """
+        Return a uint8 waveform where each bit holds the state of one digital
+        output (bit 0 is digital output 0). If an output array is given the
+        waveform is written into it (rather than into a new array).
+        """
+        if out is None:
+            sweepD = np.zeros(self.p2s[-1], np.uint8)
+        else:
+            sweepD = out
+        for i in range(len(self.levels)):
+            sweepD[self.p1s[i]:self.p2s[i]] = packDigitalState(
+                self.digitalStates[i])
+        return sweepD
+
+    def getWaveform(self, out=None):
+        """
+        Return the waveform of this sweep. If an output array is given the
+        waveform is written into it (rather than into a new array).
+        """
+        if out is None:
+            sweepC = np.full(self.p2s[-1], np.nan)
+        else:
+            if len(out) < self.p2s[-1]:
+                raise ValueError("out must have at least %d points" %
+                                 self.p2s[-1])
+            sweepC = out[:self.p2s[-1]]
+            sweepC[:] = np.nan
         for i in range(len(self.levels)):
 
             # get easier access to epoch values
@@ -173,37 +199,38 @@ class EpochSweepWaveform:
             else:
                 pulseCount = 0
 
-            # now create a "chunk" (np array) for this epoch waveform
+            # the waveform of this epoch is written directly into sweepC
+            chunk = sweepC[self.p1s[i]:self.p2s[i]]
 
             if epochType == "Step":
                 # epoch type 1: step
-                chunk = np.full(chunkSize, level)
+                chunk[:] = level
 
             elif epochType == "Ramp":
                 # epoch type 2: smooth ramp
-                chunk = np.linspace(levelBefore, level, chunkSize)
+                chunk[:] = np.linspace(levelBefore, level, chunkSize)
 
             elif epochType == "Pulse":
                 # epoch type 3: pulse train
-                chunk = np.full(chunkSize, levelBefore)
-                for pulse in range(pulseCount):
-                    p1 = int(pulsePeriod*pulse)
-                    p2 = int(p1 + pulseWidth)
-                    chunk[p1:p2] = level
+                chunk[:] = levelBefore
+                if pulseCount > 0:
+                    pulse = np.full(max(pulseWidth, pulsePeriod), levelBefore)
+                    pulse[:max(pulseWidth, 0)] = level
+                    _fillPulseTrain(chunk, pulse, pulsePeriod, pulseCount)
 
             elif epochType == "Tri":
                 # epoch type 4: triangle train
-                chunk = np.full(chunkSize, np.nan)
-                for pulse in range(pulseCount):
-                    p1 = int(pulsePeriod*pulse)
-                    p2 = int(p1 + pulseWidth)
-                    p3 = int(p1+pulsePeriod)
-                    chunk[p1:p2] = np.linspace(levelBefore, level, int(p2-p1))
-                    chunk[p2:p3] = np.linspace(level, levelBefore, int(p3-p2))
+                if pulseCount > 0:
+                    pulseWidth = min(pulseWidth, pulsePeriod)
+                    pulse = np.concatenate([
+                        np.linspace(levelBefore, level, pulseWidth),
+                        np.linspace(level, levelBefore,
+                                    pulsePeriod-pulseWidth)])
+                    _fillPulseTrain(chunk, pulse, pulsePeriod, pulseCount)
 
             elif epochType == "Cos":
                 # epoch type 5: cosine train
-                chunk = np.full(chunkSize, levelBefore)
+                chunk[:] = levelBefore
                 vals = np.linspace(0, 2*pulseCount*np.pi, len(chunk))
                 vals += np.pi
                 cos = np.cos(vals) * levelDelta/2
@@ -211,22 +238,17 @@ class EpochSweepWaveform:
 
             elif epochType == "BiPhsc":
                 # epoch type 7: biphasic train
-                chunk = np.full(chunkSize, levelBefore)
-                for pulse in range(pulseCount):
-                    p1 = int(pulsePeriod*pulse)
-                    p3 = int(p1 + pulseWidth)
-                    p2 = int((p1+p3)/2)
-                    chunk[p1:p2] = levelBefore + levelDelta
-                    chunk[p2:p3] = levelBefore - levelDelta
+                chunk[:] = levelBefore
+                if pulseCount > 0:
+                    pulse = np.full(max(pulseWidth, pulsePeriod), levelBefore)
+                    pulse[:pulseWidth//2] = levelBefore + levelDelta
+                    pulse[pulseWidth//2:pulseWidth] = levelBefore - levelDelta
+                    _fillPulseTrain(chunk, pulse, pulsePeriod, pulseCount)
 
             else:
                 # unsupported epoch type
                 msg = "Epoch type (%s) unsupported" % epochType
                 warnings.warn(msg)
-                chunk = np.full(chunkSize, np.nan)
-
-            # add the newly-made chunk to the sweepC
-            sweepC[self.p1s[i]:self.p2s[i]] = chunk
 
         return sweepC
 
@@ -238,6 +260,47 @@ class EpochSweepWaveform:
         return txt[:-2]
 
 
+def packDigitalState(digitalState):
+    """
+    Return a list of digital output states (0s and 1s, output 0 first) as a
+    single integer where each bit holds the state of one output.
+    """
+    value = 0
+    for i, state in enumerate(digitalState):
+        value |= (int(state) & 1) << i
+    return value
+
+
+def unpackDigitalOutputs(packed, digitalChannel=None):
+    """
+    Decode packed digital output states (a uint8 array from
+    getDigitalWaveformPacked or abf.getDigitalMatrix). If a digital channel
+    is given return its states (0s and 1s) in an array the same shape as the
+    packed array, otherwise return the states of all outputs (with one more
+    dimension, indexed by digital output number).
+    """
+    packed = np.asarray(packed, np.uint8)
+    if digitalChannel is not None:
+        return (packed >> digitalChannel) & 1
+    bits = np.unpackbits(packed[..., np.newaxis], axis=-1)
+    return bits[..., ::-1]
+
+
+def _fillPulseTrain(chunk, pulse, pulsePeriod, pulseCount):
+    """
+    Write a pulse waveform into chunk every pulsePeriod points (pulseCount
+    times) without looping over pulses. Pulses longer than pulsePeriod are
+    overwritten by the pulse which follows them.
+    """
+    if pulseCount < 1:
+        return
+    repeatedPoints = (pulseCount - 1) * pulsePeriod
+    pulses = chunk[:repeatedPoints].reshape(pulseCount - 1, pulsePeriod)
+    pulses[:] = pulse[:pulsePeriod]
+    lastPulse = chunk[repeatedPoints:repeatedPoints+len(pulse)]
+    lastPulse[:] = pulse[:len(lastPulse)]
+
+
 class EpochTable:
 
     def __init__(self, abf, channel):
@@ -348,11 +411,7 @@ class EpochTable:
         each of the bit.
         """
         value = int(value)
-        binString = bin(value)[2:].zfill(bitCount)
-        bits = list(binString)
-        bits = [int(x) for x in bits]
-        bits.reverse()
-        return bits
+        return [(value >> i) & 1 for i in range(bitCount)]
 
     def __str__(self):
         return self.text
@@ -431,6 +490,18 @@ class EpochTable:
         txt += "".join([x.rjust(pad) for x in pulseWidths])+"\n"
         return txt.strip('\n')
 
+    def getDigitalMatrix(self):
+        """
+        Return the state of all digital outputs for every sweep as a packed
+        uint8 array (one row per sweep, one byte per point, one bit per
+        digital output). Use unpackDigitalOutputs() to decode it.
+        """
+        sweepDs = np.zeros((len(self.epochWaveformsBySweep),
+                            self.sweepPointCount), np.uint8)
+        for sweep, sweepWaveform in enumerate(self.epochWaveformsBySweep):
+            sweepWaveform.getDigitalWaveformPacked(out=sweepDs[sweep])
+        return sweepDs
+
     def getEpochWaveformsBySweep(self, abf):
         """Return a list of EpochSweepWaveform objects (one per sweep)."""
 
@@ -9,6 +9,7 @@ import datetime
 import inspect
 import numpy as np
 import glob
+import os
 
 try:
     # this ensures pyABF is imported from this specific path
@@ -130,4 +131,90 @@ def test_uuid_isExpectedValue():
     abf = pyabf.ABF("data/abfs/2019_07_24_0055_fsi.abf")
     assert abf.fileGUID == "5689DB34-B07E-456A-811C-44E9BE92FBC6"
     assert abf.fileUUID == "834CBF1D-372E-3D19-225E-31E718BCD04D"
-    assert abf.md5 == "834CBF1D372E3D19225E31E718BCD04D"
\ No newline at end of file
+    assert abf.md5 == "834CBF1D372E3D19225E31E718BCD04D"
+
+def test_md5_backgroundAndCached(tmp_path):
+    abfPath = "data/abfs/2019_07_24_0055_fsi.abf"
+    abf = pyabf.ABF(abfPath, hashFile=True)
+    assert abf.md5 == "834CBF1D372E3D19225E31E718BCD04D"
+    assert pyabf.fileHash.md5(abfPath, chunkBytes=1000) == abf.md5
+
+    pyabf.fileHash.setCacheFile(tmp_path.joinpath("hashes.db"))
+    try:
+        assert pyabf.ABF(abfPath, loadData=False).md5 == abf.md5
+        stat = os.stat(os.path.abspath(abfPath))
+        hashCache = pyabf.fileHash.cache
+        assert hashCache.get(os.path.abspath(abfPath), stat)
+    finally:
+        pyabf.fileHash.setCacheFile(None)
+
+    # a cache closed while a background hash is running is ignored
+    assert hashCache.get(os.path.abspath(abfPath), stat) is None
+    hashCache.set(os.path.abspath(abfPath), stat, abf.md5)
+
+def test_epochTable_isBuiltOncePerChannel():
+    abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf")
+    epochTable = abf._getEpochTable(0)
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        assert isinstance(abf.sweepC, np.ndarray)
+        assert isinstance(abf.sweepD(0), np.ndarray)
+        assert abf._getEpochTable(0) is epochTable
+    assert list(abf._epochTables.keys()) == [0]
+
+@pytest.mark.parametrize("epochType", ["Pulse", "Tri", "BiPhsc"])
+def test_epochWaveform_pulseTrains(epochType):
+    sweepWaveform = pyabf.waveform.EpochSweepWaveform()
+    sweepWaveform.addEpoch(0, 100, -70.0, "Step", 0, 0, [0]*8)
+    sweepWaveform.addEpoch(100, 355, -50.0, epochType, 10, 40, [0]*8)
+    sweepC = sweepWaveform.getWaveform()
+
+    # compare each pulse with a pulse generated one at a time
+    for pulse in range(6):
+        p1 = 100 + pulse * 40
+        if epochType == "Pulse":
+            expected = [-50.0] * 10 + [-70.0] * 30
+        elif epochType == "Tri":
+            expected = np.concatenate([np.linspace(-70, -50, 10),
+                                       np.linspace(-50, -70, 30)])
+        elif epochType == "BiPhsc":
+            expected = [-50.0] * 5 + [-90.0] * 5 + [-70.0] * 30
+        assert np.array_equal(sweepC[p1:p1+40], expected)
+
+    # points after the last full pulse
+    if epochType == "Tri":
+        assert np.isnan(sweepC[340:]).all()
+    else:
+        assert np.all(sweepC[340:] == -70)
+
+@pytest.mark.parametrize("abfPath", [
+    "data/abfs/17o05026_vc_stim.abf",
+    "data/abfs/2018_11_16_sh_0006.abf",
+    "data/abfs/14o16001_vc_pair_step.abf",
+])
+def test_commandMatrix_matchesSweepC(abfPath):
+    abf = pyabf.ABF(abfPath)
+    for channel in abf.channelList:
+        sweepCs = abf.getCommandMatrix(channel)
+        assert sweepCs.shape == (abf.sweepCount, abf.sweepPointCount)
+        assert not sweepCs.flags.writeable
+        assert abf.getCommandMatrix(channel) is sweepCs
+        for sweep in abf.sweepList:
+            abf.setSweep(sweep, channel)
+            assert np.array_equal(sweepCs[sweep], abf.sweepC, equal_nan=True)
+
+def test_digitalMatrix_matchesSweepD():
+    abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf")
+    sweepDs = abf.getDigitalMatrix(0)
+    assert sweepDs.dtype == np.uint8
+    assert sweepDs.shape == (abf.sweepCount, abf.sweepPointCount)
+    allOutputs = pyabf.waveform.unpackDigitalOutputs(sweepDs)
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        for digOut in range(8):
+            sweepD = abf.sweepD(digOut)
+            assert np.array_equal(allOutputs[sweep, :, digOut], sweepD)
+            assert np.array_equal(
+                pyabf.waveform.unpackDigitalOutputs(sweepDs[sweep], digOut),
+                sweepD)
+    assert allOutputs[:, :, 4].any()
@@ -0,0 +1,117 @@
+"""
+Tests related to the SQLite catalog of ABF headers (pyabf.catalog)
+"""
+
+import sys
+import os
+import glob
+import shutil
+import pytest
+
+try:
+    # this ensures pyABF is imported from this specific path
+    sys.path.insert(0, "src")
+    import pyabf
+    import pyabf.catalog
+except:
+    raise ImportError("couldn't import local pyABF")
+
+
+allABFs = sorted(glob.glob("data/abfs/*.abf"))
+
+
+def test_catalog_matchesHeaders(tmp_path):
+    with pyabf.catalog.Catalog(tmp_path.joinpath("abfs.db")) as catalog:
+        assert catalog.scan("data/abfs", processes=2) == len(allABFs)
+        assert len(catalog) == len(allABFs)
+
+        abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf", loadData=False)
+        matches = catalog.query(protocol=abf.protocol)
+        assert os.path.abspath(abf.abfFilePath) in [x["path"] for x in matches]
+        for abfInfo in matches:
+            assert abfInfo["protocol"] == abf.protocol
+            if abfInfo["abfID"] == abf.abfID:
+                assert abfInfo["sweepCount"] == abf.sweepCount
+                assert abfInfo["dataRate"] == abf.dataRate
+                assert abfInfo["adcUnits"] == abf.adcUnits
+                assert abfInfo["abfDateTime"] == abf.abfDateTime
+
+        day = abf.abfDateTime.replace(hour=0, minute=0, second=0)
+        sameDay = catalog.query(dateStart=day, dateEnd=abf.abfDateTime)
+        assert abf.abfID in [x["abfID"] for x in sameDay]
+        assert abf.protocol in catalog.protocols()
+
+        with pytest.raises(ValueError):
+            catalog.query(notAField=1)
+
+
+def test_catalog_rescansOnlyChangedFiles(tmp_path):
+    folder = tmp_path.joinpath("abfs")
+    folder.mkdir()
+    for abfPath in allABFs[:3]:
+        shutil.copy(abfPath, str(folder))
+    databasePath = tmp_path.joinpath("abfs.db")
+
+    with pyabf.catalog.Catalog(databasePath) as catalog:
+        assert catalog.scan(folder, processes=1) == 3
+
+    with pyabf.catalog.Catalog(databasePath) as catalog:
+        assert catalog.scan(folder, processes=1) == 0
+
+        abfPaths = sorted(glob.glob(str(folder.joinpath("*.abf"))))
+        os.utime(abfPaths[0], (0, 0))
+        os.remove(abfPaths[1])
+        assert catalog.scan(folder, processes=1) == 1
+        assert len(catalog) == 2
+
+
+def test_catalog_remembersUnreadableFiles(tmp_path):
+    folder = tmp_path.joinpath("abfs")
+    folder.mkdir()
+    shutil.copy(allABFs[0], str(folder))
+    badPath = folder.joinpath("bad.abf")
+    badPath.write_bytes(b"not an ABF file")
+    databasePath = tmp_path.joinpath("abfs.db")
+
+    with pyabf.catalog.Catalog(databasePath) as catalog:
+        assert catalog.scan(folder, processes=1) == 1
+        assert catalog.scan(folder, processes=1) == 0
+        assert len(catalog) == 1
+
+        # a bad file is read again once it changes
+        shutil.copy(allABFs[1], str(badPath))
+        assert catalog.scan(folder, processes=1) == 1
+        assert len(catalog) == 2
+
+
+
+def test_catalog_nonRecursiveScanKeepsSubfolders(tmp_path):
+    folder = tmp_path.joinpath("abfs")
+    subfolder = folder.joinpath("sub")
+    subfolder.mkdir(parents=True)
+    for abfPath in allABFs[:2]:
+        shutil.copy(abfPath, str(folder))
+    shutil.copy(allABFs[2], str(subfolder))
+
+    with pyabf.catalog.Catalog(tmp_path.joinpath("abfs.db")) as catalog:
+        assert catalog.scan(folder, processes=1) == 3
+        assert catalog.scan(folder, recursive=False, processes=1) == 0
+        assert len(catalog) == 3
+
+        os.remove(str(folder.joinpath(os.path.basename(allABFs[0]))))
+        assert catalog.scan(folder, recursive=False, processes=1) == 0
+        assert len(catalog) == 2
+
+
+def test_catalog_skipsFilesDeletedDuringScan(tmp_path, monkeypatch):
+    folder = tmp_path.joinpath("abfs")
+    folder.mkdir()
+    shutil.copy(allABFs[0], str(folder))
+    abfPaths = pyabf.catalog.findABFs(str(folder))
+    missingPath = str(folder.joinpath("deleted.abf"))
+    monkeypatch.setattr(pyabf.catalog, "findABFs",
+                        lambda folder, recursive: abfPaths + [missingPath])
+
+    with pyabf.catalog.Catalog(tmp_path.joinpath("abfs.db")) as catalog:
+        assert catalog.scan(folder, processes=1) == 1
+        assert len(catalog) == 1
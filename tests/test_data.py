@@ -0,0 +1,162 @@
+"""
+Tests related to how signal data is read from ABF files. Every method of
+accessing data should yield values identical to the default (load everything
+into memory) method.
+"""
+
+import sys
+import pytest
+import glob
+import tracemalloc
+import numpy as np
+
+try:
+    # this ensures pyABF is imported from this specific path
+    sys.path.insert(0, "src")
+    import pyabf
+    import pyabf.filter
+except:
+    raise ImportError("couldn't import local pyABF")
+
+
+allABFs = glob.glob("data/abfs/*.abf")
+
+
+@pytest.mark.parametrize("abfPath", allABFs)
+def test_mmap_matchesMemory(abfPath):
+    abfMem = pyabf.ABF(abfPath)
+    abfMap = pyabf.ABF(abfPath, dataMode="mmap")
+    assert not "data" in dir(abfMap)
+    for channel in abfMem.channelList:
+        for sweep in abfMem.sweepList[:3]:
+            abfMem.setSweep(sweep, channel)
+            abfMap.setSweep(sweep, channel)
+            assert np.array_equal(abfMem.sweepY, abfMap.sweepY)
+    assert np.array_equal(abfMem.data, abfMap.data)
+
+
+def test_mmap_dataIsCachedAndWritable():
+    abfPath = "data/abfs/17o05026_vc_stim.abf"
+    abfMem = pyabf.ABF(abfPath)
+    abfMap = pyabf.ABF(abfPath, dataMode="mmap")
+    abfMap.setSweep(1)
+    assert abfMap.data is abfMap.data
+    unfilteredY = abfMap.sweepY.copy()
+    pyabf.filter.gaussian(abfMem, 2)
+    pyabf.filter.gaussian(abfMap, 2)
+    assert np.array_equal(abfMem.data, abfMap.data, equal_nan=True)
+    abfMem.setSweep(1)
+    abfMap.setSweep(1)
+    assert np.array_equal(abfMem.sweepY, abfMap.sweepY, equal_nan=True)
+    assert not np.array_equal(abfMap.sweepY, unfilteredY, equal_nan=True)
+
+
+@pytest.mark.parametrize("abfPath", allABFs)
+def test_partialRead_matchesMemory(abfPath):
+    abfMem = pyabf.ABF(abfPath)
+    abfLazy = pyabf.ABF(abfPath, loadData=False)
+    sweep = abfMem.sweepList[-1]
+    for channel in abfMem.channelList:
+        abfMem.setSweep(sweep, channel)
+        abfLazy.setSweep(sweep, channel)
+        assert np.array_equal(abfMem.sweepY, abfLazy.sweepY)
+    assert not "data" in dir(abfLazy)
+
+
+@pytest.mark.parametrize("abfPath", allABFs)
+def test_raw_matchesMemory(abfPath):
+    abfMem = pyabf.ABF(abfPath)
+    abfRaw = pyabf.ABF(abfPath, dataMode="raw")
+    assert abfRaw._dataRaw.dtype == abfRaw._dtype
+    for channel in abfMem.channelList:
+        abfMem.setSweep(0, channel)
+        abfRaw.setSweep(0, channel)
+        assert np.array_equal(abfMem.sweepY, abfRaw.sweepY)
+    assert np.array_equal(abfMem.data, abfRaw.data)
+
+
+def test_raw_dataIsCachedAndWritable():
+    abfPath = "data/abfs/17o05026_vc_stim.abf"
+    abfMem = pyabf.ABF(abfPath)
+    abfRaw = pyabf.ABF(abfPath, dataMode="raw")
+    abfRaw.setSweep(2)
+    assert abfRaw.data is abfRaw.data
+    abfRaw.data[0] *= 2
+    abfRaw.setSweep(2)
+    abfMem.setSweep(2)
+    assert np.array_equal(abfRaw.sweepY, abfMem.sweepY * 2)
+
+
+def test_raw_float64():
+    abfPath = "data/abfs/17o05026_vc_stim.abf"
+    abf32 = pyabf.ABF(abfPath)
+    abf64 = pyabf.ABF(abfPath, dataMode="raw", dataFloatType=np.float64)
+    assert abf64.sweepY.dtype == np.float64
+    assert np.allclose(abf32.sweepY, abf64.sweepY, atol=1e-4)
+
+
+def test_loadAndScaleData_peakMemory():
+    abf = pyabf.ABF("data/abfs/f1.abf", loadData=False)
+    tracemalloc.start()
+    with open(abf.abfFilePath, 'rb') as fb:
+        abf._loadAndScaleData(fb)
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # only the raw data and the scaled output should ever be allocated
+    rawBytes = abf.dataPointCount * abf.dataPointByteSize
+    assert peakBytes < (rawBytes + abf.data.nbytes) * 1.05
+
+
+@pytest.mark.parametrize("dataMode", pyabf.abf.DATA_MODES)
+def test_sweepMatrix_matchesSweeps(dataMode):
+    abf = pyabf.ABF("data/abfs/2018_11_16_sh_0006.abf", dataMode=dataMode)
+    sweeps = abf.getSweepMatrix(0)
+    assert sweeps.shape == (abf.sweepCount, abf.sweepPointCount)
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        assert np.array_equal(sweeps[sweep], abf.sweepY)
+
+    window = abf.getSweepMatrix(0, 0.01, 0.02)
+    pt1, pt2 = int(0.01*abf.dataRate), int(0.02*abf.dataRate)
+    assert np.array_equal(window, sweeps[:, pt1:pt2])
+
+
+def test_sweepMatrix_isView():
+    abf = pyabf.ABF("data/abfs/2018_11_16_sh_0006.abf")
+    sweeps = abf.getSweepMatrix(0)
+    assert np.shares_memory(sweeps, abf.data)
+
+
+@pytest.mark.parametrize("dataMode", pyabf.abf.DATA_MODES)
+def test_dataRange_matchesData(dataMode):
+    abfPath = "data/abfs/16d22006_kim_gapfree.abf"
+    abfMem = pyabf.ABF(abfPath)
+    abf = pyabf.ABF(abfPath, loadData=False, dataMode=dataMode)
+    for channel in abf.channelList:
+        dataX, dataY = abf.getDataRange(1.5, 2.5, channel)
+        pt1, pt2 = int(1.5*abf.dataRate), int(2.5*abf.dataRate)
+        assert np.array_equal(dataY, abfMem.data[channel, pt1:pt2])
+        assert len(dataX) == len(dataY)
+        assert dataX[0] == pytest.approx(1.5)
+    assert not "data" in dir(abf)
+
+
+@pytest.mark.parametrize("dataMode", pyabf.abf.DATA_MODES)
+def test_iterChunks_coversData(dataMode):
+    abfPath = "data/abfs/16d22006_kim_gapfree.abf"
+    abfMem = pyabf.ABF(abfPath)
+    abf = pyabf.ABF(abfPath, loadData=False, dataMode=dataMode)
+
+    chunks = list(abf.iterChunks(1, chunkSec=7))
+    assert chunks[1][0] == pytest.approx(7)
+    dataY = np.concatenate([chunkY for timeSec, chunkY in chunks])
+    assert np.array_equal(dataY, abfMem.data[1])
+
+    overlapPoints = int(2*abf.dataRate)
+    chunks = list(abf.iterChunks(1, chunkSec=7, overlapSec=2))
+    assert chunks[1][0] == pytest.approx(5)
+    for chunk1, chunk2 in zip(chunks[:-1], chunks[1:]):
+        assert np.array_equal(chunk1[1][-overlapPoints:],
+                              chunk2[1][:overlapPoints])
+    assert not "data" in dir(abf)
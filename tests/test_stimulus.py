@@ -7,6 +7,7 @@ as an argument when instantiating pyabf.ABF()
 import sys
 import pytest
 import os
+import shutil
 import numpy as np
 import time
 
@@ -77,3 +78,91 @@ def test_stimulus_caching():
 
     # confirm not using caching is still slow
     assert (cachedStimulusSpeedBoost(False) < 2)
+
+
+def test_stimulusCache_hitsUntilFileChanges(tmp_path):
+    stimPath = str(tmp_path.joinpath("stimulus.atf"))
+    with open(os.path.join(STIM_FOLDER, "TRIPPLE.atf"), 'rb') as f:
+        stimBytes = f.read()
+    with open(stimPath, 'wb') as f:
+        f.write(stimBytes)
+
+    cache = pyabf.stimulus.StimulusCache()
+    waveform = pyabf.stimulus.loadStimulusWaveform(stimPath, cache)
+    waveform[:] = 123  # modifying a returned waveform must not affect the cache
+    waveform = pyabf.stimulus.loadStimulusWaveform(stimPath, cache)
+    assert np.array_equal(waveform, pyabf.ATF(stimPath).sweepY)
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+    os.utime(stimPath, (0, 0))
+    pyabf.stimulus.loadStimulusWaveform(stimPath, cache)
+    assert cache.stats()["misses"] == 2
+
+
+def test_stimulusCache_isBounded():
+    cache = pyabf.stimulus.StimulusCache(maxEntries=3, maxBytes=8*350)
+    for i in range(5):
+        cache.set(i, np.zeros(100))
+    assert len(cache) == 3
+    assert 0 not in cache and 4 in cache
+
+    cache.get(2)
+    cache.set(5, np.zeros(100))
+    assert 2 in cache and 3 not in cache
+
+    cache.set(6, np.zeros(200))
+    assert cache.bytes <= 8*350
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 5
+
+
+def test_stimulusPath_isCached(monkeypatch):
+    abf = pyabf.ABF("data/abfs/171116sh_0015.abf", loadData=False)
+    pyabf.stimulus.clearStimulusPathCache()
+
+    searches = []
+    search = pyabf.stimulus._searchForStimulusWaveformFile
+    monkeypatch.setattr(pyabf.stimulus, "_searchForStimulusWaveformFile",
+                        lambda *args: searches.append(args) or search(*args))
+
+    for i in range(3):
+        stimPath = pyabf.stimulus.findStimulusWaveformFile(abf, 0)
+        assert os.path.basename(stimPath) == "sine sweep magnitude 20.abf"
+    assert len(searches) == 1
+
+    monkeypatch.setattr(pyabf.stimulus, "STIMULUS_PATH_CACHE_SEC", 0)
+    pyabf.stimulus.findStimulusWaveformFile(abf, 0)
+    assert len(searches) == 2
+
+
+def test_stimulusPath_cacheChecksFileExists(tmp_path):
+    pyabf.stimulus.clearStimulusPathCache()
+    for fileName in ["171116sh_0015.abf", "sine sweep magnitude 20.abf"]:
+        shutil.copy(os.path.join("data/abfs", fileName), str(tmp_path))
+    abf = pyabf.ABF(str(tmp_path.joinpath("171116sh_0015.abf")),
+                    loadData=False)
+    stimPath = pyabf.stimulus.findStimulusWaveformFile(abf, 0)
+    assert os.path.exists(stimPath)
+
+    os.remove(stimPath)
+    with pytest.warns(UserWarning):
+        waveform = pyabf.stimulus.stimulusWaveformFromFile(abf, 0)
+    assert np.all(np.isnan(waveform))
+
+
+def test_stimulusPath_notCachedIfCachingDisabled(monkeypatch):
+    abf = pyabf.ABF("data/abfs/171116sh_0015.abf", loadData=False,
+                    cacheStimulusFiles=False)
+    pyabf.stimulus.clearStimulusPathCache()
+
+    searches = []
+    search = pyabf.stimulus._searchForStimulusWaveformFile
+    monkeypatch.setattr(pyabf.stimulus, "_searchForStimulusWaveformFile",
+                        lambda *args: searches.append(args) or search(*args))
+
+    for i in range(3):
+        pyabf.stimulus.findStimulusWaveformFile(abf, 0)
+    assert len(searches) == 3
+    assert len(pyabf.stimulus.cachedStimulusPaths) == 0
+
@@ -0,0 +1,235 @@
+"""
+Tests related to analysis tools in pyabf.tools
+"""
+
+import sys
+import pytest
+import warnings
+import numpy as np
+
+try:
+    # this ensures pyABF is imported from this specific path
+    sys.path.insert(0, "src")
+    import pyabf
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        import pyabf.tools
+    import pyabf.tools.measure
+    import pyabf.abfWriter
+except:
+    raise ImportError("couldn't import local pyABF")
+
+
+def test_measureEpoch_matchesSweepLoop():
+    abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf")
+    results = pyabf.tools.measure.measureEpoch(abf, "B")
+    assert results["mean"].units == abf.adcUnits[0]
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        p1, p2 = abf.sweepEpochs.p1s[2], abf.sweepEpochs.p2s[2]
+        segment = abf.sweepY[p1:p2].astype(np.float64)
+        assert results["mean"].values[sweep] == pytest.approx(segment.mean())
+        assert results["min"].values[sweep] == segment.min()
+        assert results["max"].values[sweep] == segment.max()
+        area = segment.sum() / abf.dataRate
+        assert results["area"].values[sweep] == pytest.approx(area)
+        slope = np.polyfit(np.arange(len(segment)) / abf.dataRate, segment, 1)
+        assert results["slope"].values[sweep] == pytest.approx(slope[0])
+
+    byIndex = pyabf.tools.measure.measureEpoch(abf, 1, measurements=["mean"])
+    assert np.array_equal(byIndex["mean"].values, results["mean"].values)
+    with pytest.raises(ValueError):
+        pyabf.tools.measure.measureEpoch(abf, "Z")
+
+
+def test_measureSegments_variableLengths():
+    abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf")
+    p1s = np.array([100 * x for x in abf.sweepList])
+    p2s = p1s + np.array([50 * x for x in abf.sweepList])
+    p2s[-1] = abf.sweepPointCount + 100  # extends past the end of the sweep
+    results = pyabf.tools.measure.measureSegments(abf, p1s, p2s)
+    assert np.isnan(results["mean"].values[0])  # empty segment
+    for sweep in abf.sweepList[1:]:
+        abf.setSweep(sweep)
+        segment = abf.sweepY[p1s[sweep]:p2s[sweep]].astype(np.float64)
+        assert results["mean"].values[sweep] == pytest.approx(segment.mean())
+        assert results["max"].values[sweep] == segment.max()
+        if len(segment) > 1:
+            slope = np.polyfit(np.arange(len(segment)) / abf.dataRate,
+                               segment, 1)
+            assert results["slope"].values[sweep] == pytest.approx(slope[0])
+
+
+def test_measureRange_matchesSweepMatrix():
+    abf = pyabf.ABF("data/abfs/2018_11_16_sh_0006.abf")
+    results = pyabf.tools.measure.measureRange(abf, 0.02, 0.06)
+    sweeps = abf.getSweepMatrix(0, 0.02, 0.06).astype(np.float64)
+    assert np.allclose(results["mean"].values, sweeps.mean(axis=1))
+    assert np.array_equal(results["min"].values, sweeps.min(axis=1))
+
+
+def test_apPoints_matchesSweepDetection():
+    abf = pyabf.ABF("data/abfs/171116sh_0019.abf")
+    sweeps, points = pyabf.tools.ap.ap_points(abf)
+    apCounts = [0, 0, 5, 12, 18, 22, 26, 30, 31, 32, 32, 32, 31, 30, 27, 19,
+                7, 6, 6, 6, 6, 4]
+    assert list(np.bincount(sweeps, minlength=abf.sweepCount)) == apCounts
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        sweepPoints = pyabf.tools.ap.ap_points_currentSweep(abf)
+        assert list(points[sweeps == sweep]) == sweepPoints
+
+    # APs closer than 3 ms to the last AP kept are doubles
+    abf.setSweep(18)
+    assert pyabf.tools.ap.ap_points_currentSweep(abf) == [
+        2937, 3100, 12939, 32937, 33118, 42939]
+
+    apFreqInBin, apFreqFirst = pyabf.tools.ap.ap_freq_per_sweep(abf)
+    assert apFreqInBin[3] == pytest.approx(12 / abf.sweepLengthSec)
+    assert apFreqFirst[0] == 0
+    assert apFreqFirst[18] == pytest.approx(abf.dataRate / (3100 - 2937))
+
+
+def test_apPoints_keepsNoDoubles():
+    abf = pyabf.ABF("data/abfs/f1.abf")
+    sweeps, points = pyabf.tools.ap.ap_points(abf)
+    sameSweep = sweeps[1:] == sweeps[:-1]
+    assert np.all(np.diff(points)[sameSweep] >= abf.dataPointsPerMs * 3)
+    abf.setSweep(1)
+    assert pyabf.tools.ap.ap_points_currentSweep(abf)[:8] == [
+        2, 73, 136, 203, 270, 339, 399, 460]
+
+
+def test_apFeatures_matchesSweepData():
+    abf = pyabf.ABF("data/abfs/171116sh_0019.abf")
+    features = pyabf.tools.ap.ap_features(abf)
+    sweeps, points = pyabf.tools.ap.ap_points(abf)
+    assert features.dtype == pyabf.tools.ap.AP_FEATURE_DTYPE
+    assert np.array_equal(features["sweep"], sweeps)
+    assert np.array_equal(features["point"], points)
+
+    for apFeatures in features[::25]:
+        abf.setSweep(int(apFeatures["sweep"]))
+        point = int(apFeatures["point"])
+        peakPoints = abf.sweepY[point:point + 2 * abf.dataPointsPerMs]
+        assert apFeatures["peak"] == peakPoints.max()
+        assert apFeatures["threshold"] < apFeatures["peak"]
+        assert apFeatures["amplitude"] == pytest.approx(
+            apFeatures["peak"] - apFeatures["threshold"])
+
+    # full-size APs have a measurable shape
+    fullSize = features[features["amplitude"] > 50]
+    assert len(fullSize) > len(features) / 2
+    assert np.all(fullSize["riseRate"] > 15)
+    assert np.all(fullSize["fallRate"] < 0)
+    assert np.all(fullSize["ahp"] < fullSize["peak"])
+    assert 0.5 < np.nanmedian(fullSize["halfWidthMs"]) < 5
+
+
+def test_apFeatures_nanWithoutThreshold(tmp_path):
+    # an AP which rises from a ramp faster than thresholdDvDt (12 mV/ms)
+    sweep = np.full(1000, -70.0)
+    sweep[300:400] = -70 + np.arange(100) * 0.6
+    sweep[400:420] = -10 + np.arange(20) * 5
+    sweep[420:460] = 90 - np.arange(40) * 5
+    sweep[460:] = -110 + np.arange(540) * 40 / 540
+    abfPath = str(tmp_path.joinpath("ap.abf"))
+    pyabf.abfWriter.writeABF1(np.array([sweep]), abfPath, 20000, "mV")
+
+    features = pyabf.tools.ap.ap_features(pyabf.ABF(abfPath))
+    assert len(features) == 1
+    assert np.isnan(features["threshold"][0])
+    assert np.isnan(features["amplitude"][0])
+    assert np.isnan(features["halfWidthMs"][0])
+    assert features["peak"][0] == pytest.approx(90, abs=0.1)
+    assert features["ahp"][0] == pytest.approx(-110, abs=0.1)
+
+
+def test_apFeaturesFiles_matchesSingleFile():
+    abfPaths = ["data/abfs/171116sh_0019.abf", "data/abfs/f1.abf"]
+    featuresByFile = pyabf.tools.ap.ap_features_files(abfPaths, processes=2)
+    for abfPath, features in zip(abfPaths, featuresByFile):
+        expected = pyabf.tools.ap.ap_features(pyabf.ABF(abfPath))
+        assert features.tobytes() == expected.tobytes()
+
+
+def test_monoExpFit_matchesKnownCurves():
+    rateHz = 20000
+    Xs = np.arange(500) / rateHz
+    taus = np.array([0.0005, 0.001, 0.002, 0.004])
+    I0s = np.array([1000, 500, 250, 100])
+    traces = I0s[:, np.newaxis] * np.exp(-Xs / taus[:, np.newaxis])
+    lengths = np.array([500, 400, 300, 200])
+    traces[np.arange(500) >= lengths[:, np.newaxis]] = np.nan
+
+    fitTaus, fitI0s, residuals = pyabf.tools.memtestMath.monoExpFit(
+        traces, rateHz, lengths)
+    assert np.allclose(fitTaus, taus)
+    assert np.allclose(fitI0s, I0s)
+    assert np.all(residuals < 0.01)
+
+    # the successive approximation fit of a single trace agrees
+    tau = pyabf.tools.memtestMath._tauMonoExpFit(traces[1, :400], rateHz)
+    assert fitTaus[1] == pytest.approx(tau, rel=0.01)
+
+    # traces no decay can fit use the successive approximation fit
+    noise = np.array([[0.089, 0.0188, 0.0756, 0.21, 0.1]])
+    fitTaus, fitI0s, residuals = pyabf.tools.memtestMath.monoExpFit(
+        noise, rateHz)
+    assert fitTaus[0] == pyabf.tools.memtestMath._tauMonoExpFit(
+        noise[0], rateHz)
+
+    fitTaus, fitI0s, residuals = pyabf.tools.memtestMath.monoExpFit(
+        traces[:1, :100], rateHz, [0])
+    assert np.isnan(fitTaus[0])
+
+
+@pytest.mark.parametrize("abfPath", [
+    "data/abfs/2018_11_16_sh_0006.abf",
+    "data/abfs/model_vc_ramp.abf",
+])
+def test_memtest_matchesSweepBySweep(abfPath):
+    abf = pyabf.ABF(abfPath)
+    memtest = pyabf.tools.memtest.Memtest(abf)
+    assert pyabf.tools.memtestMath.sweepsStep(abf) is not None
+    assert pyabf.tools.memtestMath.sweepsRamp(abf) is not None
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        Ih, Rm, Ra, CmStep = pyabf.tools.memtestMath.currentSweepStep(abf)
+        CmRamp = pyabf.tools.memtestMath.currentSweepRamp(abf)
+        expected = [Ih, Rm, Ra, CmStep, CmRamp]
+        measured = [memtest.Ih, memtest.Rm, memtest.Ra, memtest.CmStep,
+                    memtest.CmRamp]
+        for value, measurement in zip(expected, measured):
+            assert measurement.values[sweep] == pytest.approx(
+                value, rel=1e-4, nan_ok=True)
+
+
+@pytest.mark.parametrize("abfPath, sweep, expected, tolerance", [
+    # Ih, Rm, Ra, CmStep, CmRamp from the successive approximation fit
+    ("2018_11_16_sh_0006", 0, [-119.38, 505.18, 14.863, 23.371, None], .01),
+    ("2018_11_16_sh_0006", 30, [-119.35, 506.72, 15.006, 23.506, None], .01),
+    ("2018_11_16_sh_0006", 59, [-141.25, 505.82, 14.955, 23.432, None], .01),
+    ("17o05024_vc_steps", 0, [-22.142, 1435.7, 49.489, 21.541, None], .01),
+    ("17o05024_vc_steps", 6, [-23.337, 2040.4, 47.957, 31.25, None], .01),
+    ("model_vc_ramp", 0, [None, None, None, None, 31.172], .01),
+    # transients of only a few points fit less precisely
+    ("2018_12_15_0000", 0, [0.019059, 20138, 1.5312e6, 0.065307, None], .05),
+    ("2018_12_15_0000", 2, [-0.13366, 19207, 6.7413e5, 3.7826, None], .05),
+    ("2018_12_15_0000", 4, [0.042734, 21557, 16035, 0.0034882, None], .05),
+    ("2018_12_15_0000", 5, [None, None, None, None, None], .05),
+    ("2018_12_15_0000", 7, [-0.15113, 21834, 3.4892e5, 7.3083, None], .05),
+    ("2018_12_15_0000", 9, [0.031315, 19862, 5.5504e5, 4.5943, None], .05),
+])
+def test_memtest_matchesSuccessiveApproximation(abfPath, sweep, expected,
+                                                tolerance):
+    abf = pyabf.ABF("data/abfs/%s.abf" % abfPath)
+    memtest = pyabf.tools.memtest.Memtest(abf)
+    measured = [memtest.Ih, memtest.Rm, memtest.Ra, memtest.CmStep,
+                memtest.CmRamp]
+    for value, measurement in zip(expected, measured):
+        if value is None:
+            assert np.isnan(measurement.values[sweep])
+        else:
+            assert measurement.values[sweep] == pytest.approx(
+                value, rel=tolerance)
@@ -0,0 +1,227 @@
+"""
+Tests related to creating ABF1 files with pyabf.abfWriter
+"""
+
+import sys
+import struct
+import pytest
+import numpy as np
+
+try:
+    # this ensures pyABF is imported from this specific path
+    sys.path.insert(0, "src")
+    import pyabf
+    import pyabf.abfWriter
+except:
+    raise ImportError("couldn't import local pyABF")
+
+
+def test_writeABF1_roundTrip(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    sweepData = np.random.normal(-50, 10, size=(3, 1000))
+    pyabf.abfWriter.writeABF1(sweepData, abfPath, 20000, units="mV")
+
+    abf = pyabf.ABF(abfPath)
+    assert abf.sweepCount == 3
+    assert abf.dataRate == 20000
+    assert abf.adcUnits == ["mV"]
+    resolution = 10 / 2**15 / abf._headerV1.fInstrumentScaleFactor[0]
+    for sweep in abf.sweepList:
+        abf.setSweep(sweep)
+        assert np.allclose(abf.sweepY, sweepData[sweep], atol=resolution)
+
+
+def test_writeABF1_multiChannel(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    sweepData = np.random.normal(size=(2, 4, 500))
+    sweepData[1] *= 1000
+    pyabf.abfWriter.writeABF1(sweepData, abfPath, 10000, ["pA", "mV"])
+
+    abf = pyabf.ABF(abfPath)
+    assert abf.channelCount == 2
+    assert abf.dataRate == 10000
+    assert abf.adcUnits == ["pA", "mV"]
+    for channel in abf.channelList:
+        saved = abf.getSweepMatrix(channel)
+        scale = abf._headerV1.fInstrumentScaleFactor[channel]
+        assert np.allclose(saved, sweepData[channel], atol=10/2**15/scale)
+
+
+def test_saveABF1_savesAllChannels(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    abf = pyabf.ABF("data/abfs/14o16001_vc_pair_step.abf")
+    abf.saveABF1(abfPath, abf.dataRate)
+
+    saved = pyabf.ABF(abfPath)
+    assert saved.channelCount == abf.channelCount
+    assert saved.sweepCount == abf.sweepCount
+    assert saved.adcUnits == abf.adcUnits
+    for channel in abf.channelList:
+        original = abf.getSweepMatrix(channel)
+        scale = saved._headerV1.fInstrumentScaleFactor[channel]
+        assert np.allclose(saved.getSweepMatrix(channel), original,
+                           atol=10/2**15/scale)
+
+
+def test_saveABF1_rawModeCopiesExactValues(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    abf = pyabf.ABF("data/abfs/14o16001_vc_pair_step.abf", dataMode="raw")
+    abf.saveABF1(abfPath, abf.dataRate)
+
+    saved = pyabf.ABF(abfPath)
+    assert saved.channelCount == abf.channelCount
+    assert saved.sweepCount == abf.sweepCount
+    for channel in abf.channelList:
+        original = abf.getSweepMatrix(channel)
+        assert np.array_equal(saved.getSweepMatrix(channel), original)
+
+
+@pytest.mark.parametrize("dataMode", ["memory", "raw", "mmap"])
+def test_saveABF1_keepsModifiedData(tmp_path, dataMode):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    abf = pyabf.ABF("data/abfs/17o05026_vc_stim.abf", dataMode=dataMode)
+    abf.data[0] += 100
+    abf.saveABF1(abfPath)
+
+    saved = pyabf.ABF(abfPath)
+    original = pyabf.ABF("data/abfs/17o05026_vc_stim.abf")
+    scale = saved._headerV1.fInstrumentScaleFactor[0]
+    assert np.allclose(saved.getSweepMatrix(0), abf.getSweepMatrix(0),
+                       atol=10/2**15/scale)
+    assert np.allclose(saved.getSweepMatrix(0) - original.getSweepMatrix(0),
+                       100, atol=10/2**15/scale)
+
+
+@pytest.mark.parametrize("abfPath", [
+    "data/abfs/16d22006_kim_gapfree.abf",
+    "data/abfs/2018_11_16_sh_0006.abf",
+    "data/abfs/05210017_vc_abf1.abf",
+])
+def test_saveABF1_copiesRawValues(tmp_path, abfPath):
+    savedPath = str(tmp_path.joinpath("test.abf"))
+    abf = pyabf.ABF(abfPath, dataMode="raw")
+    abf.saveABF1(savedPath)
+
+    saved = pyabf.ABF(savedPath, dataMode="raw")
+    assert saved.sweepCount == abf.sweepCount
+    assert saved.dataRate == abf.dataRate
+    assert np.array_equal(saved._dataRaw, abf._dataRaw[:, :len(saved.data[0])])
+    assert np.array_equal(saved._dataGain, abf._dataGain)
+    assert np.array_equal(saved._dataOffset, abf._dataOffset)
+
+
+def test_ABFWriter_matchesWriteABF1(tmp_path):
+    sweepData = np.random.normal(size=(2, 5, 400))
+    path1 = str(tmp_path.joinpath("array.abf"))
+    path2 = str(tmp_path.joinpath("stream.abf"))
+    pyabf.abfWriter.writeABF1(sweepData, path1, 20000, ["pA", "mV"])
+
+    maxValue = np.max(np.abs(sweepData), axis=(1, 2))
+    with pyabf.abfWriter.ABFWriter(path2, 20000, 400, ["pA", "mV"], 2,
+                                   maxValue) as writer:
+        writer.writeSweeps(sweepData[:, x] for x in range(3))
+        writer.write(sweepData[:, 3:].reshape(2, -1)[:, :150])
+        writer.write(sweepData[:, 3:].reshape(2, -1)[:, 150:])
+
+    with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+        assert f1.read() == f2.read()
+
+
+def test_writeABF1_dataNotReadAsHeader(tmp_path):
+    # header values beyond a short header (e.g., nTelegraphEnable at byte
+    # 4512) must not be read from sample data
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    sweepData = np.zeros((1, 5000))
+    sweepData[0, 0] = 5
+    sweepData[0, 1232] = pyabf.abfWriter.ADC_RANGE / \
+        pyabf.abfWriter.ADC_RESOLUTION
+    pyabf.abfWriter.writeABF1(sweepData, abfPath, 20000)
+
+    abf = pyabf.ABF(abfPath)
+    assert abf._headerV1.nTelegraphEnable[0] == 0
+    assert np.allclose(abf.sweepY, sweepData[0], atol=1e-3)
+
+
+def test_ABFWriter_dataNotReadAsHeader(tmp_path):
+    # header values beyond a short header (e.g., nTelegraphEnable at byte
+    # 4512) must not be read from sample data
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    data = np.zeros(5000)
+    data[1232] = pyabf.abfWriter.ADC_RANGE / pyabf.abfWriter.ADC_RESOLUTION
+    with pyabf.abfWriter.ABFWriter(abfPath, 20000, 5000, maxValue=5) as writer:
+        writer.write(data)
+    with open(abfPath, 'rb') as f:
+        f.seek(40)
+        dataSectionPtr = struct.unpack('i', f.read(4))[0]
+        f.seek(dataSectionPtr * pyabf.abfWriter.BLOCKSIZE + 1232 * 2)
+        assert f.read(2) == b'\x01\x00'
+
+    abf = pyabf.ABF(abfPath)
+    assert abf._headerV1.nTelegraphEnable[0] == 0
+    assert not np.any(np.isnan(abf.sweepY))
+    assert abf.sweepY[1232] == pytest.approx(data[1232], abs=1e-4)
+
+
+def test_truncatedHeader_fails(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    pyabf.abfWriter.writeABF1(np.zeros((1, 100)), abfPath, 20000)
+    with open(abfPath, 'rb') as f:
+        headerStart = f.read(2048)
+    with open(abfPath, 'wb') as f:
+        f.write(headerStart)
+    with pytest.raises(struct.error):
+        pyabf.ABF(abfPath)
+
+
+def test_ABFWriter_gapFree(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    data = np.random.normal(size=5000)
+    with pyabf.abfWriter.ABFWriter(abfPath, 10000, maxValue=10) as writer:
+        for chunk in np.array_split(data, 7):
+            writer.write(chunk)
+
+    abf = pyabf.ABF(abfPath)
+    assert abf.sweepCount == 1
+    assert abf.sweepPointCount == len(data)
+    assert np.allclose(abf.sweepY, data, atol=abf._dataGain[0])
+
+
+def test_ABFWriter_padsIncompleteSweep(tmp_path):
+    abfPath = str(tmp_path.joinpath("test.abf"))
+    with pyabf.abfWriter.ABFWriter(abfPath, 10000, 100) as writer:
+        writer.write(np.ones(250))
+
+    abf = pyabf.ABF(abfPath)
+    assert abf.sweepCount == 3
+    abf.setSweep(2)
+    assert np.allclose(abf.sweepY[:50], 1, atol=abf._dataGain[0])
+    assert np.all(abf.sweepY[50:] == 0)
+
+
+def test_saveSubset_matchesOriginal(tmp_path):
+    subsetPath = str(tmp_path.joinpath("subset.abf"))
+    abf = pyabf.ABF("data/abfs/14o16001_vc_pair_step.abf")
+    abf.saveSubset(subsetPath, sweeps=[1, 3], channels=[1],
+                   timeSec1=0.1, timeSec2=0.3)
+
+    subset = pyabf.ABF(subsetPath)
+    assert subset.channelCount == 1
+    assert subset.sweepCount == 2
+    assert subset.adcUnits == [abf.adcUnits[1]]
+    sweeps = abf.getSweepMatrix(1, 0.1, 0.3)
+    assert np.array_equal(subset.getSweepMatrix(0), sweeps[[1, 3]])
+
+
+def test_saveSubset_gapFreeTimeRange(tmp_path):
+    subsetPath = str(tmp_path.joinpath("subset.abf"))
+    abf = pyabf.ABF("data/abfs/16d22006_kim_gapfree.abf", loadData=False)
+    abf.saveSubset(subsetPath, timeSec1=2, timeSec2=5)
+
+    subset = pyabf.ABF(subsetPath)
+    assert subset.sweepCount == 1
+    for channel in abf.channelList:
+        dataX, dataY = abf.getDataRange(2, 5, channel)
+        assert np.array_equal(subset.data[channel], dataY)
+
+    with pytest.raises(ValueError):
+        abf.saveSubset(subsetPath, sweeps=[1])